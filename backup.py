@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, IO
+
+from database import QUERIES
+
+# A source that keeps restarting (because it is written to between steps)
+# is finished with a single-step copy, which in WAL mode is one read
+# snapshot and still does not block writers
+MAX_RESTARTS = 3
+
+class _TooManyRestarts(Exception):
+    """Raised from the progress callback to abandon a step-wise backup"""
+
+def backup_file(source_path: str, target_path: str, pages: int = 64, sleep: float = 0.01,
+                progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """Copy a live database file with SQLite's online backup API
+
+    Copies ``pages`` pages per step and sleeps between steps so the bot's
+    writer is never held up for long. The copy is written next to the
+    target and renamed into place only once it is complete.
+    """
+    start = time.perf_counter()
+    partial_path = f"{target_path}.partial"
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    restarts = 0
+    last_remaining = None
+
+    def on_progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if progress:
+            progress(total - remaining, total)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(partial_path)
+    try:
+        source.execute('PRAGMA busy_timeout=5000')
+        try:
+            source.backup(target, pages=max(1, pages), progress=on_progress, sleep=sleep)
+        except _TooManyRestarts:
+            source.backup(target, pages=-1)
+
+        check = target.execute('PRAGMA quick_check').fetchone()[0]
+        if check != 'ok':
+            raise sqlite3.DatabaseError(f"Backup failed integrity check: {check}")
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(partial_path, target_path)
+    return {
+        'source': source_path,
+        'target': target_path,
+        'bytes': os.path.getsize(target_path),
+        'restarts': restarts,
+        'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+def backup_files(source_paths: List[str], target_dir: str, **options) -> List[Dict[str, Any]]:
+    """Back up several database files (e.g. every shard) into one directory"""
+    os.makedirs(target_dir, exist_ok=True)
+    return [
+        backup_file(path, os.path.join(target_dir, os.path.basename(path)), **options)
+        for path in source_paths
+    ]
+
+async def backup_database(db, target_dir: Optional[str] = None, **options) -> List[Dict[str, Any]]:
+    """Back up every file of a running Database without blocking the event loop"""
+    if target_dir is None:
+        target_dir = os.path.join('backups', datetime.utcnow().strftime('%Y%m%d-%H%M%S'))
+    # Commit queued write-behind batches so the copy includes them
+    await db.flush()
+    return await asyncio.to_thread(backup_files, db.backend.paths, target_dir, **options)
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Column names of an existing table (also validates the table name)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    if not exists:
+        raise ValueError(f"Unknown table: {table}")
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def export_table(db_path: str, table: str, out: IO[str], batch_size: int = 1000) -> int:
+    """Write every row of a table to ``out`` as JSON lines, one batch in memory at a time"""
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = _table_columns(conn, table)
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        count = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return count
+            out.writelines(json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in rows)
+            count += len(rows)
+    finally:
+        conn.close()
+
+def import_table(db_path: str, table: str, source: IO[str], batch_size: int = 1000,
+                 replace: bool = True) -> int:
+    """Load JSON lines into a table in short batched transactions
+
+    Columns missing from a line are left to their defaults; unknown keys
+    are ignored. Importing tickets rebuilds ticket_counters afterwards.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA busy_timeout=5000')
+        columns = set(_table_columns(conn, table))
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        count = 0
+        batch = {}
+
+        def flush():
+            # Rows are grouped by their column set so each group is one executemany
+            with conn:
+                for keys, rows in batch.items():
+                    conn.executemany(
+                        f"{verb} INTO {table} ({', '.join(keys)}) VALUES ({', '.join('?' * len(keys))})",
+                        rows
+                    )
+            batch.clear()
+
+        pending = 0
+        for line in source:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            keys = tuple(key for key in record if key in columns)
+            batch.setdefault(keys, []).append(tuple(record[key] for key in keys))
+            pending += 1
+            if pending >= batch_size:
+                flush()
+                count += pending
+                pending = 0
+
+        if pending:
+            flush()
+            count += pending
+
+        if table == 'tickets':
+            with conn:
+                conn.execute('DELETE FROM ticket_counters')
+                conn.execute(
+                    'INSERT INTO ticket_counters (guild_id, total_count, open_count, closed_count) '
+                    + QUERIES['count_tickets']
+                )
+        return count
+    finally:
+        conn.close()
+
+def list_tables(db_path: str) -> List[str]:
+    """User tables in a database file"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    # Usage:
+    #   python backup.py backup --db spark_utility.db --out backups/
+    #   python backup.py export --db spark_utility.db --out export/ [--table tickets]
+    #   python backup.py import --db spark_utility.db --in export/ [--table tickets]
+    parser = argparse.ArgumentParser(description="Online backup and JSONL export/import")
+    parser.add_argument('action', choices=['backup', 'export', 'import'])
+    parser.add_argument('--db', nargs='+', default=["spark_utility.db"], help="Database file(s)")
+    parser.add_argument('--out', help="Backup/export directory")
+    parser.add_argument('--in', dest='source', help="Directory of .jsonl files to import")
+    parser.add_argument('--table', nargs='*', help="Tables to export/import (default: all)")
+    parser.add_argument('--pages', type=int, default=64, help="Pages copied per backup step")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.action == 'backup':
+        target_dir = args.out or os.path.join('backups', datetime.utcnow().strftime('%Y%m%d-%H%M%S'))
+        for result in backup_files(args.db, target_dir, pages=args.pages):
+            print(f"{result['source']} -> {result['target']} ({result['bytes']} bytes, {result['duration_ms']}ms)")
+
+    elif args.action == 'export':
+        for db_path in args.db:
+            target_dir = os.path.join(args.out or 'export', os.path.splitext(os.path.basename(db_path))[0])
+            os.makedirs(target_dir, exist_ok=True)
+            for table in args.table or list_tables(db_path):
+                with open(os.path.join(target_dir, f"{table}.jsonl"), 'w', encoding='utf-8') as out:
+                    count = export_table(db_path, table, out, args.batch_size)
+                print(f"{db_path}: {table} ({count} rows)")
+
+    else:
+        if not args.source:
+            parser.error("import needs --in")
+        db_path = args.db[0]
+        tables = args.table or [name[:-len('.jsonl')] for name in sorted(os.listdir(args.source))
+                                if name.endswith('.jsonl')]
+        for table in tables:
+            with open(os.path.join(args.source, f"{table}.jsonl"), encoding='utf-8') as source:
+                count = import_table(db_path, table, source, args.batch_size)
+            print(f"{db_path}: {table} ({count} rows)")
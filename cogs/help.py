@@ -1,14 +1,14 @@
 import discord
 from discord.ext import commands
 from discord import ui
-import os
 
 class HelpView(ui.View):
     """View for help command with category selection"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, prefix: str):
         super().__init__(timeout=300)
         self.bot = bot
+        self.prefix = prefix
     
     @ui.select(
         placeholder="Select a category...",
@@ -38,7 +38,7 @@ class HelpView(ui.View):
     
     def get_utility_embed(self):
         """Get utility commands embed"""
-        prefix = os.getenv('PREFIX', '!')
+        prefix = self.prefix
         
         embed = discord.Embed(
             title="🔧 Utility Commands",
@@ -62,6 +62,7 @@ class HelpView(ui.View):
         **{prefix}channelinfo [channel]** - Get channel info
         **{prefix}invite** - Get bot invite link
         **{prefix}uptime** - Show bot uptime
+        **{prefix}prefix [new prefix]** - Show or change this server's prefix
         """
         
         embed.add_field(name="Commands", value=commands_text, inline=False)
@@ -70,7 +71,7 @@ class HelpView(ui.View):
     
     def get_tickets_embed(self):
         """Get ticket commands embed"""
-        prefix = os.getenv('PREFIX', '!')
+        prefix = self.prefix
         
         embed = discord.Embed(
             title="🎫 Ticket System",
@@ -104,7 +105,7 @@ class HelpView(ui.View):
     
     def get_moderation_embed(self):
         """Get moderation commands embed"""
-        prefix = os.getenv('PREFIX', '!')
+        prefix = self.prefix
         
         embed = discord.Embed(
             title="🛡️ Moderation Commands",
@@ -119,6 +120,8 @@ class HelpView(ui.View):
         **{prefix}kick [user] [reason]** - Kick a user
         **{prefix}slowmode [seconds]** - Set channel slowmode
         **{prefix}logs [channel]** - Set log channel
+        **{prefix}logs search [filters]** - Search stored logs (user:, command:, since:)
+        **{prefix}logs policy** - Show or tune what is logged (level, sample, category)
         """
         
         embed.add_field(name="Commands", value=commands_text, inline=False)
@@ -133,7 +136,7 @@ class HelpView(ui.View):
     
     def get_fun_embed(self):
         """Get fun commands embed"""
-        prefix = os.getenv('PREFIX', '!')
+        prefix = self.prefix
         
         embed = discord.Embed(
             title="🎉 Fun Commands",
@@ -152,6 +155,7 @@ class HelpView(ui.View):
         **{prefix}remind [time] [message]** - Set a reminder
         **{prefix}timer [time]** - Start a countdown timer
         **{prefix}afk [reason]** - Set AFK status
+        **{prefix}afknotice [seconds]** - Fold repeat AFK notices per channel
         **{prefix}choose [options]** - Choose randomly from options
         **{prefix}eightball [question]** - Ask the magic 8-ball
         **{prefix}meme** - Get a random meme
@@ -163,7 +167,7 @@ class HelpView(ui.View):
     
     def get_other_embed(self):
         """Get other commands embed"""
-        prefix = os.getenv('PREFIX', '!')
+        prefix = self.prefix
         
         embed = discord.Embed(
             title="📋 Other Commands",
@@ -201,12 +205,16 @@ class Help(commands.Cog):
             args = ' '.join(ctx.args[2:]) if len(ctx.args) > 2 else ""
             await logging_cog.log_command(ctx, ctx.command.name, args)
     
+    def get_prefix(self, ctx) -> str:
+        """The prefix that works where the help was asked for"""
+        return self.bot.prefix_matcher.display_prefix(ctx.guild.id if ctx.guild else None)
+    
     @commands.command(name='help')
     async def help_command(self, ctx, *, command: str = None):
         """Show help for commands"""
         if command is None:
             # Show main help menu
-            prefix = os.getenv('PREFIX', '!')
+            prefix = self.get_prefix(ctx)
             
             embed = discord.Embed(
                 title="🚀 Spark Utility Bot",
@@ -243,7 +251,7 @@ class Help(commands.Cog):
             
             embed.set_footer(text=f"Use {prefix}help [command] for detailed help on a specific command")
             
-            view = HelpView(self.bot)
+            view = HelpView(self.bot, prefix)
             await ctx.send(embed=embed, view=view)
             
         else:
@@ -260,7 +268,7 @@ class Help(commands.Cog):
             )
             
             # Add usage info
-            prefix = os.getenv('PREFIX', '!')
+            prefix = self.get_prefix(ctx)
             usage = f"{prefix}{cmd.name}"
             
             if cmd.signature:
@@ -1,9 +1,30 @@
 import discord
 from discord.ext import commands
+import asyncio
+import json
 import os
 import traceback
-from datetime import datetime
-from typing import Optional
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+from utils.embed_batcher import EmbedBatcher
+from utils.embeds import error_embed
+from utils.cache import TTLCache
+from utils.helpers import parse_time, is_bot_owner
+from utils.log_store import LogStore
+from utils.error_fingerprints import ErrorTracker
+from utils.log_policy import LogPolicy, DEFAULT_POLICY, LEVELS, CATEGORIES, COG_CATEGORIES
+from utils.log_queue import LogRecord, LogQueue
+
+# Batcher destination for the owner's DMs (log channels are keyed by channel id)
+OWNER = 'owner'
+
+WEBHOOK_NAME = "Spark Utility Logs"
+# After a failed create_webhook, log channels wait this long before trying again
+WEBHOOK_RETRY_SECONDS = 600
+
+SEARCH_OPTIONS = {'user', 'command', 'kind', 'since', 'until', 'limit', 'guild'}
 
 class LoggingSystem(commands.Cog):
     """Comprehensive logging system for the bot"""
@@ -12,6 +33,45 @@ class LoggingSystem(commands.Cog):
         self.bot = bot
         self.owner_id = int(os.getenv('OWNER_ID', 0))
 
+        # Log calls only queue a record; the worker renders it and hands it
+        # to the batcher, which packs up to 10 embeds into each message
+        config = bot.config
+        self.store = LogStore(config.log_store_dir, config.log_segment_bytes, config.log_store_max_segments)
+        self.batcher = EmbedBatcher(self.send_batch, interval=config.log_batch_interval)
+        self.queue = LogQueue(self.deliver, maxsize=config.log_queue_size, overflow=config.log_queue_overflow)
+        self.queue.start()
+
+        # Guild id -> logging policy, loaded once and updated by the logs commands;
+        # checked before a record is even created
+        self.policies: Dict[int, LogPolicy] = {}
+        self.filtered = 0
+        self.policy_task = asyncio.create_task(self.load_policies())
+
+        # Error fingerprints; repeats are summarised in a periodic digest
+        # (ERROR_DIGEST_MINUTES <= 0 turns the digest off; repeats are still counted)
+        self.errors = ErrorTracker(config.error_fingerprints_max)
+        self.digest_task = None
+        if config.error_digest_minutes > 0:
+            self.digest_task = asyncio.create_task(self.send_error_digests())
+
+        # Log channel id -> webhook its traffic goes through
+        self.webhooks: Dict[int, discord.Webhook] = {}
+        # Log channels where creating a webhook just failed (e.g. 429 or 5xx);
+        # they use normal sends until the entry expires and creation is retried
+        self.webhook_failures = TTLCache(1000, WEBHOOK_RETRY_SECONDS)
+        self.webhook_stats = {'webhook_sends': 0, 'fallback_sends': 0, 'created': 0, 'lost': 0}
+
+    async def cog_unload(self):
+        """Deliver what is still queued and batched, then stop the worker"""
+        self.policy_task.cancel()
+        if self.digest_task:
+            self.digest_task.cancel()
+        abandoned = await self.queue.close(self.bot.config.log_drain_timeout)
+        await self.batcher.flush_all()
+        self.store.close()
+        if abandoned:
+            print(f"Dropped {abandoned} queued log records on unload")
+
     async def get_log_channel(self, guild_id: int) -> Optional[discord.TextChannel]:
         """Get the log channel for a guild"""
         try:
@@ -23,194 +83,284 @@ class LoggingSystem(commands.Cog):
             print(f"Error getting log channel: {e}")
         return None
 
-    async def log_command(self, ctx, command_name: str, args: str = "", success: bool = True, error: str = ""):
-        """Log a command execution"""
+    async def load_policies(self):
+        """Read every guild's logging policy into memory"""
         try:
-            embed = discord.Embed(
-                title="📝 Command Executed" if success else "❌ Command Failed",
-                color=discord.Color.green() if success else discord.Color.red(),
-                timestamp=datetime.utcnow()
-            )
-
-            # Command info
-            embed.add_field(
-                name="Command",
-                value=f"`{command_name}`",
-                inline=True
-            )
-
-            # User info
-            embed.add_field(
-                name="User",
-                value=f"{ctx.author} ({ctx.author.id})",
-                inline=True
-            )
-
-            # Server info
-            embed.add_field(
-                name="Server",
-                value=f"{ctx.guild.name} ({ctx.guild.id})" if ctx.guild else "DM",
-                inline=True
-            )
-
-            # Channel info
-            embed.add_field(
-                name="Channel",
-                value=f"{ctx.channel.name} ({ctx.channel.id})" if hasattr(ctx.channel, 'name') else f"DM ({ctx.channel.id})",
-                inline=True
-            )
-
-            # Arguments
-            if args:
-                embed.add_field(
-                    name="Arguments",
-                    value=f"```{args}```",
-                    inline=False
-                )
-
-            # Error details
-            if error:
-                embed.add_field(
-                    name="Error Details",
-                    value=f"```{error[:1000]}```",
-                    inline=False
-                )
-
-            # Send to owner
-            await self.send_to_owner(embed)
+            for settings in await self.bot.db.get_logging_policies():
+                self.policies[settings.guild_id] = LogPolicy.from_settings(settings)
+        except Exception as e:
+            print(f"Error loading logging policies: {e}")
+
+    def allows(self, guild, kind: str, category: Optional[str], name: Optional[str], success: bool = True) -> bool:
+        """Check a guild's logging policy (in memory only)"""
+        policy = self.policies.get(guild.id, DEFAULT_POLICY) if guild else DEFAULT_POLICY
+        if policy.allows(kind, category, name, success):
+            return True
+        self.filtered += 1
+        return False
+
+    async def send_error_digests(self):
+        """Background task DMing the owner repeat counts per error fingerprint"""
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            await asyncio.sleep(self.bot.config.error_digest_minutes * 60)
+            try:
+                digest = self.errors.take_digest()
+                if digest:
+                    await self.batcher.add(OWNER, self.digest_embed(digest))
+            except Exception as e:
+                print(f"Error sending error digest: {e}")
+
+    def digest_embed(self, digest) -> discord.Embed:
+        """Summarise repeated errors since the last digest"""
+        lines = [
+            f"`{group.fingerprint}` **{group.type_name}** ×{repeats} (total {group.count})"
+            f"{f' in `{group.command}`' if group.command else ''}"
+            for group, repeats in digest
+        ]
+        embed = discord.Embed(
+            title="🧾 Error Digest",
+            description="\n".join(lines)[:4096],
+            color=discord.Color.orange(),
+            timestamp=datetime.utcnow()
+        )
+        embed.set_footer(text=f"Repeats in the last {self.bot.config.error_digest_minutes} minutes; first occurrences were reported in full")
+        return embed
 
-            # Send to log channel if configured
-            if ctx.guild:
-                log_channel = await self.get_log_channel(ctx.guild.id)
-                if log_channel:
-                    try:
-                        await log_channel.send(embed=embed)
-                    except Exception as e:
-                        print(f"Error sending to log channel: {e}")
+    def where(self, guild, channel) -> Dict[str, Any]:
+        """Server and channel labels for a record"""
+        return {
+            'server': f"{guild.name} ({guild.id})" if guild else "DM",
+            'channel': f"{channel.name} ({channel.id})" if hasattr(channel, 'name') else f"DM ({channel.id})"
+        }
 
+    async def log_command(self, ctx, command_name: str, args: str = "", success: bool = True, error: str = ""):
+        """Log a command execution (queued; returns immediately)"""
+        category = COG_CATEGORIES.get(ctx.cog.qualified_name) if ctx.cog else None
+        if not self.allows(ctx.guild, 'command', category, command_name, success and not error):
+            return
+        try:
+            self.queue.put(LogRecord('command', {
+                'command': command_name,
+                'user': f"{ctx.author} ({ctx.author.id})",
+                'user_id': ctx.author.id,
+                'channel_id': ctx.channel.id,
+                **self.where(ctx.guild, ctx.channel),
+                'args': args,
+                'error': error
+            }, guild_id=ctx.guild.id if ctx.guild else None, success=success))
         except Exception as e:
             print(f"Error in log_command: {e}")
-            traceback.print_exc()
 
     async def log_action(self, action: str, guild: discord.Guild = None, user: discord.User = None, 
-                        channel: discord.TextChannel = None, details: str = "", success: bool = True):
-        """Log a bot action"""
+                        channel: discord.TextChannel = None, details: str = "", success: bool = True,
+                        category: Optional[str] = None):
+        """Log a bot action (queued; returns immediately)"""
+        if not self.allows(guild, 'action', category, action, success):
+            return
         try:
-            embed = discord.Embed(
-                title="🔧 Bot Action" if success else "❌ Action Failed",
-                color=discord.Color.blue() if success else discord.Color.red(),
-                timestamp=datetime.utcnow()
-            )
-
-            embed.add_field(
-                name="Action",
-                value=f"`{action}`",
-                inline=True
-            )
-
-            if user:
-                embed.add_field(
-                    name="User",
-                    value=f"{user} ({user.id})",
-                    inline=True
-                )
-
-            if guild:
-                embed.add_field(
-                    name="Server",
-                    value=f"{guild.name} ({guild.id})",
-                    inline=True
-                )
-
-            if channel:
-                embed.add_field(
-                    name="Channel",
-                    value=f"{channel.name} ({channel.id})",
-                    inline=True
-                )
-
-            if details:
-                embed.add_field(
-                    name="Details",
-                    value=f"```{details[:1000]}```",
-                    inline=False
-                )
-
-            await self.send_to_owner(embed)
-
-            # Send to log channel if configured
-            if guild:
-                log_channel = await self.get_log_channel(guild.id)
-                if log_channel:
-                    try:
-                        await log_channel.send(embed=embed)
-                    except Exception as e:
-                        print(f"Error sending to log channel: {e}")
-
+            self.queue.put(LogRecord('action', {
+                'action': action,
+                'user': f"{user} ({user.id})" if user else None,
+                'user_id': user.id if user else None,
+                'channel_id': channel.id if channel else None,
+                'server': f"{guild.name} ({guild.id})" if guild else None,
+                'channel': f"{channel.name} ({channel.id})" if channel else None,
+                'details': details
+            }, guild_id=guild.id if guild else None, success=success))
         except Exception as e:
             print(f"Error in log_action: {e}")
-            traceback.print_exc()
 
     async def log_error(self, ctx, error):
-        """Log an error that occurred"""
-        try:
-            error_msg = str(error)
-            stack_trace = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
-
-            embed = discord.Embed(
-                title="🚨 Error Occurred",
-                color=discord.Color.red(),
-                timestamp=datetime.utcnow()
-            )
+        """Log an error that occurred (queued; returns immediately)
 
-            if ctx.command:
-                embed.add_field(
-                    name="Command",
-                    value=f"`{ctx.command.name}`",
-                    inline=True
+        Only the first occurrence of a fingerprint is reported in full;
+        repeats are counted for the digest and kept in the log store.
+        """
+        try:
+            command = ctx.command.name if ctx.command else None
+            group, is_new = self.errors.record(error, command)
+            self.queue.put(LogRecord('error', {
+                'command': command,
+                'user': f"{ctx.author} ({ctx.author.id})",
+                'user_id': ctx.author.id,
+                'channel_id': ctx.channel.id,
+                **self.where(ctx.guild, ctx.channel),
+                'error': str(error),
+                'fingerprint': group.fingerprint,
+                'repeat': not is_new,
+                'stack_trace': (
+                    ''.join(traceback.format_exception(type(error), error, error.__traceback__)) if is_new else ""
                 )
+            }, guild_id=ctx.guild.id if ctx.guild else None, success=False))
+        except Exception as e:
+            print(f"Error in log_error: {e}")
 
-            embed.add_field(
-                name="User",
-                value=f"{ctx.author} ({ctx.author.id})",
-                inline=True
-            )
-
-            embed.add_field(
-                name="Server",
-                value=f"{ctx.guild.name} ({ctx.guild.id})" if ctx.guild else "DM",
-                inline=True
-            )
-
-            embed.add_field(
-                name="Channel",
-                value=f"{ctx.channel.name} ({ctx.channel.id})" if hasattr(ctx.channel, 'name') else f"DM ({ctx.channel.id})",
-                inline=True
+    def render(self, record: LogRecord) -> discord.Embed:
+        """Build the embed for a queued record"""
+        data = record.data
+        if record.kind == 'command':
+            embed = discord.Embed(
+                title="📝 Command Executed" if record.success else "❌ Command Failed",
+                color=discord.Color.green() if record.success else discord.Color.red(),
+                timestamp=record.created_at
             )
-
-            embed.add_field(
-                name="Error",
-                value=f"```{error_msg[:500]}```",
-                inline=False
+            embed.add_field(name="Command", value=f"`{data['command']}`", inline=True)
+            embed.add_field(name="User", value=data['user'], inline=True)
+            embed.add_field(name="Server", value=data['server'], inline=True)
+            embed.add_field(name="Channel", value=data['channel'], inline=True)
+            if data['args']:
+                embed.add_field(name="Arguments", value=f"```{data['args']}```", inline=False)
+            if data['error']:
+                embed.add_field(name="Error Details", value=f"```{data['error'][:1000]}```", inline=False)
+
+        elif record.kind == 'action':
+            embed = discord.Embed(
+                title="🔧 Bot Action" if record.success else "❌ Action Failed",
+                color=discord.Color.blue() if record.success else discord.Color.red(),
+                timestamp=record.created_at
             )
-
-            embed.add_field(
-                name="Stack Trace",
-                value=f"```{stack_trace[:1000]}```",
-                inline=False
+            embed.add_field(name="Action", value=f"`{data['action']}`", inline=True)
+            if data['user']:
+                embed.add_field(name="User", value=data['user'], inline=True)
+            if data['server']:
+                embed.add_field(name="Server", value=data['server'], inline=True)
+            if data['channel']:
+                embed.add_field(name="Channel", value=data['channel'], inline=True)
+            if data['details']:
+                embed.add_field(name="Details", value=f"```{data['details'][:1000]}```", inline=False)
+
+        else:
+            embed = discord.Embed(
+                title="🚨 Error Occurred",
+                color=discord.Color.red(),
+                timestamp=record.created_at
             )
+            if data['command']:
+                embed.add_field(name="Command", value=f"`{data['command']}`", inline=True)
+            embed.add_field(name="User", value=data['user'], inline=True)
+            embed.add_field(name="Server", value=data['server'], inline=True)
+            embed.add_field(name="Channel", value=data['channel'], inline=True)
+            embed.add_field(name="Fingerprint", value=f"`{data['fingerprint']}`", inline=True)
+            embed.add_field(name="Error", value=f"```{data['error'][:500]}```", inline=False)
+            embed.add_field(name="Stack Trace", value=f"```{data['stack_trace'][:1000]}```", inline=False)
+
+        return embed
+
+    def store_record(self, record: LogRecord):
+        """Append a record to the local searchable log store"""
+        data = record.data
+        if record.kind == 'command':
+            name, detail, error = data['command'], data['args'], data['error']
+        elif record.kind == 'action':
+            name, detail, error = data['action'], data['details'], ""
+        else:
+            name, error = data['command'], data['error']
+            detail = f"fingerprint {data['fingerprint']}\n{data['stack_trace']}"
+
+        self.store.append(
+            record.kind, record.success, record.guild_id, data['user_id'], data['channel_id'],
+            name, detail or "", error or "",
+            timestamp=record.created_at.replace(tzinfo=timezone.utc).timestamp()
+        )
 
-            await self.send_to_owner(embed)
-
+    async def deliver(self, record: LogRecord):
+        """Store a record, then batch it for the owner and, except for errors, the guild's log channel"""
+        try:
+            self.store_record(record)
         except Exception as e:
-            print(f"Error in log_error: {e}")
-            traceback.print_exc()
+            print(f"Error writing to log store: {e}")
+
+        if record.kind == 'error' and record.data['repeat']:
+            return  # counted for the digest
+
+        embed = self.render(record)
+        await self.batcher.add(OWNER, embed)
+
+        if record.guild_id and record.kind != 'error':
+            log_channel = await self.get_log_channel(record.guild_id)
+            if log_channel:
+                await self.batcher.add(log_channel.id, embed)
+
+    async def send_batch(self, destination, embeds: List[discord.Embed]):
+        """Send one multi-embed message to the owner or a log channel"""
+        if destination == OWNER:
+            await self.send_to_owner(*embeds)
+            return
+
+        channel = self.bot.get_channel(destination)
+        if channel:
+            await self.send_to_log_channel(channel, embeds)
+
+    async def get_log_webhook(self, channel: discord.TextChannel) -> Optional[discord.Webhook]:
+        """Webhook for a log channel, reused from memory or guild_settings, created if needed"""
+        if channel.id in self.webhooks:
+            return self.webhooks[channel.id]
+        if self.webhook_failures.lookup(channel.id)[0]:
+            return None
+
+        settings = await self.bot.db.get_guild_settings(channel.guild.id)
+        if settings and settings.get('log_webhook_id') and settings.get('log_webhook_token'):
+            webhook = discord.Webhook.partial(settings['log_webhook_id'], settings['log_webhook_token'], client=self.bot)
+        elif channel.permissions_for(channel.guild.me).manage_webhooks:
+            try:
+                webhook = await channel.create_webhook(name=WEBHOOK_NAME, reason="Log channel delivery")
+            except discord.HTTPException as e:
+                # e.g. the channel already has the maximum number of webhooks
+                print(f"Error creating log webhook: {e}")
+                self.webhook_failures.set(channel.id, True)
+                return None
+            await self.bot.db.set_log_webhook(channel.guild.id, webhook.id, webhook.token)
+            self.webhook_stats['created'] += 1
+        else:
+            return None
+
+        self.webhooks[channel.id] = webhook
+        return webhook
+
+    async def send_to_log_channel(self, channel: discord.TextChannel, embeds: List[discord.Embed]):
+        """Send through the channel's webhook (its own rate limit), else as the bot"""
+        webhook = await self.get_log_webhook(channel)
+        if webhook is not None:
+            try:
+                await webhook.send(
+                    embeds=embeds,
+                    username=self.bot.user.name,
+                    avatar_url=self.bot.user.display_avatar.url
+                )
+                self.webhook_stats['webhook_sends'] += 1
+                return
+            except discord.NotFound:
+                # Deleted by someone; send normally now, a new one is created next time
+                self.webhook_stats['lost'] += 1
+                self.webhooks.pop(channel.id, None)
+                await self.bot.db.set_log_webhook(channel.guild.id, None, None)
+
+        await channel.send(embeds=embeds)
+        self.webhook_stats['fallback_sends'] += 1
+
+    async def forget_log_webhook(self, guild_id: int):
+        """Delete a guild's log webhook (the log channel changed)"""
+        settings = await self.bot.db.get_guild_settings(guild_id)
+        if not settings:
+            return
+
+        self.webhooks.pop(settings.get('log_channel_id'), None)
+        self.webhook_failures.invalidate(settings.get('log_channel_id'))
+        if not settings.get('log_webhook_id'):
+            return
+
+        await self.bot.db.set_log_webhook(guild_id, None, None)
+        try:
+            webhook = discord.Webhook.partial(settings['log_webhook_id'], settings['log_webhook_token'], client=self.bot)
+            await webhook.delete(reason="Log channel changed")
+        except discord.HTTPException:
+            pass
 
-    async def send_to_owner(self, embed: discord.Embed):
-        """Send an embed to the bot owner"""
+    async def send_to_owner(self, *embeds: discord.Embed):
+        """Send embeds (up to 10) to the bot owner in one message"""
         try:
-            owner = await self.bot.fetch_user(self.owner_id)
-            await owner.send(embed=embed)
+            await self.bot.resolver.send_dm(self.owner_id, embeds=list(embeds))
         except discord.Forbidden:
             print("Cannot send DM to owner - DMs are closed")
         except discord.NotFound:
@@ -218,13 +368,14 @@ class LoggingSystem(commands.Cog):
         except Exception as e:
             print(f"Error sending to owner: {e}")
 
-    @commands.command(name='logs')
+    @commands.group(name='logs', invoke_without_command=True)
     @commands.has_permissions(administrator=True)
     async def set_log_channel(self, ctx, channel: discord.TextChannel = None):
         """Set the log channel for this server"""
         if channel is None:
             channel = ctx.channel
 
+        await self.forget_log_webhook(ctx.guild.id)
         await self.bot.db.set_guild_setting(ctx.guild.id, 'log_channel_id', channel.id)
 
         embed = discord.Embed(
@@ -240,8 +391,206 @@ class LoggingSystem(commands.Cog):
             guild=ctx.guild,
             user=ctx.author,
             channel=channel,
-            details=f"Log channel set to {channel.name}"
+            details=f"Log channel set to {channel.name}",
+            category='logging'
         )
 
+    @set_log_channel.command(name='search')
+    @commands.has_permissions(administrator=True)
+    async def search_logs(self, ctx, *, filters: str = ""):
+        """Search stored logs: user:@user command:name kind:command|action|error since:2d until:1h limit:25"""
+        options = dict(re.findall(r'(\w+):(\S+)', filters))
+        unknown = set(options) - SEARCH_OPTIONS
+        if unknown:
+            await ctx.send(embed=error_embed(
+                "Invalid Filter",
+                f"Unknown filter(s): {', '.join(sorted(unknown))}\nUse: {', '.join(sorted(SEARCH_OPTIONS))}"
+            ))
+            return
+
+        try:
+            # Administrators search their own server; the owner may pick any (or guild:all)
+            guild_id = ctx.guild.id
+            if 'guild' in options and ctx.author.id == self.owner_id:
+                guild_id = None if options['guild'] == 'all' else int(options['guild'])
+            user_id = int(options['user'].strip('<@!>')) if 'user' in options else None
+            limit = min(max(int(options.get('limit', 25)), 1), 50)
+            now = time.time()
+            since = until = None
+            if 'since' in options:
+                since = int(now - parse_time(options['since']).total_seconds())
+            if 'until' in options:
+                until = int(now - parse_time(options['until']).total_seconds())
+        except (ValueError, AttributeError):
+            await ctx.send(embed=error_embed(
+                "Invalid Filter",
+                "Guilds and users are ids (or mentions), times look like 2d or 1h30m"
+            ))
+            return
+
+        records = await asyncio.to_thread(
+            self.store.search,
+            guild_id=guild_id, user_id=user_id, name=options.get('command'),
+            since=since, until=until, kind=options.get('kind'), limit=limit
+        )
+
+        icons = {'command': '📝', 'action': '🔧', 'error': '🚨'}
+        lines = []
+        for record in records:
+            line = f"<t:{record['t']}:f> {icons.get(record['k'], '•')}{'' if record['ok'] else '❌'} `{record['c']}`"
+            if record['u']:
+                line += f" <@{record['u']}>"
+            if guild_id is None and record['g']:
+                line += f" ({record['g']})"
+            if record['e']:
+                line += f" — {record['e'][:80]}"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title="🔎 Log Search",
+            description="\n".join(lines)[:4096] if lines else "No matching log entries",
+            color=discord.Color.blue()
+        )
+        stats = self.store.get_stats()
+        embed.set_footer(text=f"{len(records)} shown | {stats['records']} records in {stats['segments']} segments")
+        await ctx.send(embed=embed)
+
+    async def update_policy(self, guild_id: int, setting: str, value):
+        """Store one policy setting and refresh the in-memory policy"""
+        await self.bot.db.set_guild_setting(guild_id, setting, value)
+        settings = await self.bot.db.get_guild_settings(guild_id)
+        policy = LogPolicy.from_settings(settings)
+        if policy.is_default:
+            self.policies.pop(guild_id, None)
+        else:
+            self.policies[guild_id] = policy
+        return policy
+
+    @set_log_channel.command(name='policy')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def show_policy(self, ctx):
+        """Show what this server logs"""
+        policy = self.policies.get(ctx.guild.id, DEFAULT_POLICY)
+        embed = discord.Embed(title="📋 Logging Policy", color=discord.Color.blue())
+        embed.add_field(name="Level", value=f"`{policy.level}`", inline=True)
+        embed.add_field(
+            name="Disabled Categories",
+            value=", ".join(f"`{category}`" for category in sorted(policy.disabled)) or "None",
+            inline=True
+        )
+        embed.add_field(
+            name="Sampling",
+            value="\n".join(f"`{name}`: {rate:.0%}" for name, rate in sorted(policy.sampling.items())) or "None",
+            inline=False
+        )
+        embed.set_footer(text="Errors and failed commands are always logged")
+        await ctx.send(embed=embed)
+
+    @set_log_channel.command(name='level')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def set_level(self, ctx, level: str):
+        """Log everything (all), only moderation (moderation) or only errors (errors)"""
+        level = level.lower()
+        if level not in LEVELS:
+            await ctx.send(embed=discord.Embed(
+                title="❌ Invalid Level",
+                description=f"Choose one of: {', '.join(LEVELS)}",
+                color=discord.Color.red()
+            ))
+            return
+
+        await self.update_policy(ctx.guild.id, 'log_level', None if level == 'all' else level)
+        await ctx.send(embed=discord.Embed(
+            title="✅ Logging Level Set",
+            description=f"This server now logs: `{level}`",
+            color=discord.Color.green()
+        ))
+
+    @set_log_channel.command(name='sample')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def set_sampling(self, ctx, command_name: str, percent: int):
+        """Log only a percentage of a command's executions (100 logs all)"""
+        command = self.bot.get_command(command_name)
+        if command is None or not 0 <= percent <= 100:
+            await ctx.send(embed=discord.Embed(
+                title="❌ Invalid Sampling",
+                description="Give an existing command and a percentage from 0 to 100",
+                color=discord.Color.red()
+            ))
+            return
+
+        sampling = dict(self.policies.get(ctx.guild.id, DEFAULT_POLICY).sampling)
+        if percent == 100:
+            sampling.pop(command.name, None)
+        else:
+            sampling[command.name] = percent / 100
+        await self.update_policy(ctx.guild.id, 'log_sampling', json.dumps(sampling) if sampling else None)
+        await ctx.send(embed=discord.Embed(
+            title="✅ Sampling Updated",
+            description=f"`{command.name}` executions are now logged {percent}% of the time",
+            color=discord.Color.green()
+        ))
+
+    @set_log_channel.command(name='category')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def toggle_category(self, ctx, category: str, state: str):
+        """Turn logging of a command category on or off"""
+        category, state = category.lower(), state.lower()
+        if category not in CATEGORIES or state not in ('on', 'off'):
+            await ctx.send(embed=discord.Embed(
+                title="❌ Invalid Category",
+                description=f"Use `on` or `off` with one of: {', '.join(CATEGORIES)}",
+                color=discord.Color.red()
+            ))
+            return
+
+        disabled = set(self.policies.get(ctx.guild.id, DEFAULT_POLICY).disabled)
+        if state == 'off':
+            disabled.add(category)
+        else:
+            disabled.discard(category)
+        await self.update_policy(
+            ctx.guild.id, 'log_disabled_categories', json.dumps(sorted(disabled)) if disabled else None
+        )
+        await ctx.send(embed=discord.Embed(
+            title="✅ Category Updated",
+            description=f"Logging of `{category}` is now {state}",
+            color=discord.Color.green()
+        ))
+
+    @commands.command(name='errors')
+    @is_bot_owner()
+    async def list_errors(self, ctx, limit: int = 10):
+        """List the most frequent error fingerprints"""
+        groups = self.errors.top(min(max(limit, 1), 25))
+        if not groups:
+            await ctx.send(embed=discord.Embed(
+                title="✅ Errors",
+                description="No errors recorded since startup",
+                color=discord.Color.green()
+            ))
+            return
+
+        embed = discord.Embed(
+            title="🚨 Top Errors",
+            color=discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        for group in groups:
+            embed.add_field(
+                name=f"{group.type_name} ×{group.count}",
+                value=f"`{group.fingerprint}`{f' in `{group.command}`' if group.command else ''}"
+                      f"{f' at `{group.location}`' if group.location else ''}\n"
+                      f"{group.message[:150] or '(no message)'}\n"
+                      f"Last seen <t:{int(group.last_seen.replace(tzinfo=timezone.utc).timestamp())}:R>",
+                inline=False
+            )
+        embed.set_footer(text=f"{len(self.errors.groups)} distinct fingerprints tracked")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(LoggingSystem(bot))
\ No newline at end of file
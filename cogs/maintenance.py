@@ -0,0 +1,318 @@
+import discord
+from discord.ext import commands
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+from database import RETENTION_FIELDS
+from backup import backup_database
+from retention import RetentionEngine
+from utils.embeds import *
+from utils.helpers import *
+
+class Maintenance(commands.Cog):
+    """Database retention, archival and diagnostics"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        config = bot.config
+        self.engine = RetentionEngine(
+            bot.db,
+            defaults={
+                'closed_ticket_days': config.retention_closed_ticket_days,
+                'report_days': config.retention_report_days,
+                'suggestion_days': config.retention_suggestion_days,
+                'reminder_days': config.retention_reminder_days,
+                'afk_days': config.retention_afk_days
+            },
+            archive_path=config.retention_archive_path,
+            batch_size=config.retention_batch_size
+        )
+        self.last_report = None
+
+        # Start retention task
+        self.retention_task = asyncio.create_task(self.run_retention())
+
+    def cog_unload(self):
+        """Clean up when cog is unloaded"""
+        self.retention_task.cancel()
+
+    async def cog_before_invoke(self, ctx):
+        """Log command before execution"""
+        logging_cog = self.bot.get_cog('LoggingSystem')
+        if logging_cog:
+            args = ' '.join(str(arg) for arg in ctx.args[2:]) if len(ctx.args) > 2 else ""
+            await logging_cog.log_command(ctx, ctx.command.name, args)
+
+    async def run_retention(self):
+        """Background task applying the retention policies"""
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                report = await self.engine.run()
+                self.last_report = report
+                print(
+                    f"Retention: moved {sum(report['moved'].values())} rows, "
+                    f"deleted {sum(report['deleted'].values())}, "
+                    f"reclaimed {format_bytes(report['bytes_reclaimed'])} in {report['duration_ms']:.0f}ms"
+                )
+            except Exception as e:
+                print(f"Error in retention run: {e}")
+
+            await asyncio.sleep(self.bot.config.retention_interval_hours * 3600)
+
+    def report_embed(self, report: dict) -> discord.Embed:
+        """Build an embed summarising a retention run"""
+        embed = discord.Embed(
+            title="🗄️ Retention Run",
+            color=discord.Color.green(),
+            timestamp=datetime.utcnow()
+        )
+
+        moved = "\n".join(f"`{table}`: {count}" for table, count in report['moved'].items())
+        deleted = "\n".join(f"`{table}`: {count}" for table, count in report['deleted'].items())
+        embed.add_field(name="Archived", value=moved, inline=True)
+        embed.add_field(name="Deleted", value=deleted, inline=True)
+        embed.add_field(name="Reclaimed", value=format_bytes(report['bytes_reclaimed']), inline=True)
+        embed.add_field(name="Duration", value=f"{report['duration_ms']:.0f}ms", inline=True)
+        return embed
+
+    @commands.group(name='retention', invoke_without_command=True)
+    @commands.has_permissions(administrator=True)
+    async def retention(self, ctx):
+        """Show this server's retention periods"""
+        policy = await self.bot.db.get_retention_policy(ctx.guild.id)
+
+        embed = discord.Embed(
+            title="🗄️ Data Retention",
+            description="Days before old rows are archived (0 keeps them forever)",
+            color=discord.Color.blue()
+        )
+
+        for kind, field in RETENTION_FIELDS.items():
+            days = policy.get(field) if policy else None
+            if days is None:
+                value = f"{self.engine.defaults[field]} (default)"
+            else:
+                value = str(days)
+            embed.add_field(name=kind.capitalize(), value=value, inline=True)
+
+        embed.set_footer(text="Use retention set <kind> <days> to change a period")
+        await ctx.send(embed=embed)
+
+    @retention.command(name='set')
+    @commands.has_permissions(administrator=True)
+    async def retention_set(self, ctx, kind: str, days: Optional[int] = None):
+        """Override a retention period (omit days to restore the default)"""
+        field = RETENTION_FIELDS.get(kind.lower())
+        if field is None:
+            await ctx.send(embed=error_embed("Invalid Kind", f"Choose one of: {', '.join(RETENTION_FIELDS)}"))
+            return
+
+        if days is not None and days < 0:
+            await ctx.send(embed=error_embed("Invalid Days", "Days must be 0 or more"))
+            return
+
+        await self.bot.db.set_retention_policy(ctx.guild.id, field, days)
+
+        if days is None:
+            message = f"{kind.capitalize()} retention restored to the default"
+        elif days == 0:
+            message = f"{kind.capitalize()} will be kept forever"
+        else:
+            message = f"{kind.capitalize()} older than {days} days will be archived"
+        await ctx.send(embed=success_embed("Retention Updated", message))
+
+    @retention.command(name='run')
+    @is_bot_owner()
+    async def retention_run(self, ctx):
+        """Run a retention pass now"""
+        message = await ctx.send(embed=loading_embed("Running retention..."))
+        try:
+            report = await self.engine.run(convert=True)
+        except Exception as e:
+            await message.edit(embed=error_embed("Retention Failed", str(e)))
+            return
+
+        self.last_report = report
+        await message.edit(embed=self.report_embed(report))
+
+    @commands.command(name='backup')
+    @is_bot_owner()
+    async def backup(self, ctx):
+        """Take an online backup of the database"""
+        message = await ctx.send(embed=loading_embed("Backing up database..."))
+        target_dir = os.path.join(self.bot.config.backup_dir, datetime.utcnow().strftime('%Y%m%d-%H%M%S'))
+        try:
+            results = await backup_database(self.bot.db, target_dir, pages=self.bot.config.backup_pages_per_step)
+        except Exception as e:
+            await message.edit(embed=error_embed("Backup Failed", str(e)))
+            return
+
+        files = "\n".join(
+            f"`{os.path.basename(result['target'])}` {format_bytes(result['bytes'])} in {result['duration_ms']:.0f}ms"
+            for result in results
+        )
+        await message.edit(embed=success_embed("Backup Complete", f"Saved to `{target_dir}`\n{files}"))
+
+    @commands.group(name='dbstats', invoke_without_command=True)
+    @is_bot_owner()
+    async def dbstats(self, ctx, limit: int = 15):
+        """Show database latency percentiles per method"""
+        stats = self.bot.db.query_stats()
+        if not stats:
+            await ctx.send(embed=info_embed("Database Stats", "No queries recorded yet"))
+            return
+
+        lines = [f"{'method':<24}{'calls':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>9}{'rows':>8}{'wait':>8}"]
+        for method, row in list(stats.items())[:limit]:
+            lines.append(
+                f"{method[:23]:<24}{row['calls']:>7}{row['p50_ms']:>8.2f}{row['p95_ms']:>8.2f}"
+                f"{row['p99_ms']:>8.2f}{row['max_ms']:>9.2f}{row['rows']:>8}{row['lock_wait_ms']:>8.1f}"
+            )
+
+        embed = discord.Embed(
+            title="📈 Database Stats",
+            description=truncate_text("```\n" + "\n".join(lines) + "\n```", 4096),
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        slow = sum(row['slow'] for row in stats.values())
+        errors = sum(row['errors'] for row in stats.values())
+        embed.set_footer(
+            text=f"Times in ms, wait = total lock wait | {slow} slow (>= {self.bot.db.metrics.slow_query_ms:g}ms), {errors} failed"
+        )
+        await ctx.send(embed=embed)
+
+    @dbstats.command(name='pool')
+    @is_bot_owner()
+    async def dbstats_pool(self, ctx):
+        """Show connection pool usage per database file, for sizing DB_POOL_SIZE"""
+        embed = discord.Embed(
+            title="🔌 Connection Pools",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        for path, pool in self.bot.db.pool_stats().items():
+            wait_rate = pool['waits'] / pool['checkouts'] * 100 if pool['checkouts'] else 0.0
+            embed.add_field(
+                name=os.path.basename(path),
+                value=(
+                    f"Readers: {pool['in_use']}/{pool['size']} in use (peak {pool['max_in_use']})\n"
+                    f"Checkouts: {pool['checkouts']} ({pool['waits']} waited, {wait_rate:.1f}%)\n"
+                    f"Writer: {pool['writer_checkouts']} checkouts, {pool['writer_waits']} waited\n"
+                    f"Writes: {pool['writes']} in {pool['commits']} commits, "
+                    f"{pool['failed_writes']} failed, {pool['queued_writes']} queued"
+                ),
+                inline=False
+            )
+        embed.set_footer(text="Frequent reader waits or a peak at the pool size suggest raising DB_POOL_SIZE")
+        await ctx.send(embed=embed)
+
+    @dbstats.command(name='reset')
+    @is_bot_owner()
+    async def dbstats_reset(self, ctx):
+        """Clear the recorded database stats"""
+        self.bot.db.metrics.reset()
+        await ctx.send(embed=success_embed("Database Stats", "Statistics cleared"))
+
+    @commands.command(name='hookstats')
+    @is_bot_owner()
+    async def hookstats(self, ctx):
+        """Show how often each message hook runs and how long it takes"""
+        stats = self.bot.message_hooks.get_stats()
+        if not stats:
+            await ctx.send(embed=info_embed("Message Hooks", "No message hooks registered"))
+            return
+
+        lines = [f"{'hook':<16}{'calls':>9}{'skipped':>10}{'errors':>8}{'avg':>9}{'max':>9}"]
+        for name, row in stats.items():
+            lines.append(
+                f"{name[:15]:<16}{row['calls']:>9}{row['skipped']:>10}{row['errors']:>8}"
+                f"{row['avg_ms']:>9.2f}{row['max_ms']:>9.2f}"
+            )
+
+        embed = discord.Embed(
+            title="🪝 Message Hooks",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.set_footer(text="Times in ms; skipped = rejected by the hook's prefilter")
+        await ctx.send(embed=embed)
+
+    @commands.command(name='cachestats')
+    @is_bot_owner()
+    async def cachestats(self, ctx):
+        """Show hit rates of the in-process caches and REST calls saved"""
+        resolver = self.bot.resolver.get_stats()
+        settings = self.bot.db.cache_stats()['guild_settings']
+
+        embed = discord.Embed(
+            title="🧠 Caches",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(
+            name="Guild Settings",
+            value=f"{settings['size']}/{settings['maxsize']} entries, {settings['hit_rate']:.1%} hits",
+            inline=False
+        )
+        embed.add_field(
+            name="Users",
+            value=f"{resolver['gateway_hits']} from gateway cache, {resolver['cache_hits']} from TTL cache, "
+                  f"{resolver['coalesced']} coalesced\n"
+                  f"{resolver['fetches']} fetched, {resolver['dm_opens']} DM channels opened",
+            inline=False
+        )
+        embed.add_field(name="REST Calls Saved", value=str(resolver['calls_saved']), inline=True)
+        await ctx.send(embed=embed)
+
+    @commands.command(name='logstats')
+    @is_bot_owner()
+    async def logstats(self, ctx):
+        """Show the log delivery queue's counters"""
+        logging_cog = self.bot.get_cog('LoggingSystem')
+        if not logging_cog:
+            await ctx.send(embed=error_embed("Log Queue", "The logging system is not loaded"))
+            return
+
+        queue = logging_cog.queue
+        stats = queue.stats
+        sent = stats['delivered'] + stats['failed']
+        embed = discord.Embed(
+            title="📨 Log Queue",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Queued", value=f"{len(queue)} / {queue.maxsize}", inline=True)
+        embed.add_field(name="High Water", value=str(stats['high_water']), inline=True)
+        embed.add_field(name="Overflow", value=queue.overflow, inline=True)
+        embed.add_field(name="Enqueued", value=str(stats['enqueued']), inline=True)
+        embed.add_field(name="Delivered", value=str(stats['delivered']), inline=True)
+        embed.add_field(name="Failed", value=str(stats['failed']), inline=True)
+        embed.add_field(name="Dropped", value=str(stats['dropped']), inline=True)
+        embed.add_field(
+            name="Avg Delivery",
+            value=f"{queue.delivery_time / sent * 1000:.0f}ms" if sent else "n/a",
+            inline=True
+        )
+
+        batcher = logging_cog.batcher
+        embed.add_field(
+            name="Batching",
+            value=f"{batcher.stats['embeds']} embeds in {batcher.stats['messages']} messages "
+                  f"({batcher.calls_saved} sends saved, {batcher.pending} pending, {batcher.stats['failed']} failed)",
+            inline=False
+        )
+        webhooks = logging_cog.webhook_stats
+        embed.add_field(
+            name="Log Channels",
+            value=f"{webhooks['webhook_sends']} via webhook, {webhooks['fallback_sends']} as the bot "
+                  f"({webhooks['created']} webhooks created, {webhooks['lost']} lost)",
+            inline=False
+        )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Maintenance(bot))
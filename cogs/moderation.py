@@ -103,7 +103,7 @@ class Moderation(commands.Cog):
             # Try to find the user by ID or username
             try:
                 if user.isdigit():
-                    user = await self.bot.fetch_user(int(user))
+                    user = await self.bot.resolver.get_user(int(user))
                 else:
                     # Search through ban list
                     bans = [ban async for ban in ctx.guild.bans()]
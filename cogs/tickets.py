@@ -262,7 +262,8 @@ class Tickets(commands.Cog):
                     guild=interaction.guild,
                     user=interaction.user,
                     channel=channel,
-                    details=f"Category: {category}, ID: {ticket_id}"
+                    details=f"Category: {category}, ID: {ticket_id}",
+                    category='tickets'
                 )
 
         except Exception as e:
@@ -318,8 +319,8 @@ class Tickets(commands.Cog):
 
                 # Send to owner
                 try:
-                    owner = await self.bot.fetch_user(int(os.getenv('OWNER_ID')))
-                    await owner.send(
+                    await self.bot.resolver.send_dm(
+                        int(os.getenv('OWNER_ID')),
                         f"Transcript for ticket #{ticket['id']} in {interaction.guild.name}",
                         file=file
                     )
@@ -351,7 +352,8 @@ class Tickets(commands.Cog):
                     "Ticket Closed",
                     guild=interaction.guild,
                     user=interaction.user,
-                    details=f"Ticket ID: {ticket['id']}"
+                    details=f"Ticket ID: {ticket['id']}",
+                    category='tickets'
                 )
 
         except Exception as e:
@@ -407,7 +409,8 @@ class Tickets(commands.Cog):
                     guild=interaction.guild,
                     user=interaction.user,
                     channel=interaction.channel,
-                    details=f"Ticket ID: {ticket['id']}"
+                    details=f"Ticket ID: {ticket['id']}",
+                    category='tickets'
                 )
 
         except Exception as e:
@@ -10,6 +10,8 @@ from typing import Optional
 import math
 from utils.embeds import *
 from utils.helpers import *
+from utils.afk_notices import AfkNoticeCoalescer
+from utils.hooks import has_mentions
 
 class Utility(commands.Cog):
     """Utility commands for the bot"""
@@ -17,13 +19,20 @@ class Utility(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.afk_check_enabled = True
+        # Folds repeat AFK notices per channel
+        self.afk_notices = AfkNoticeCoalescer()
 
         # Start reminder check task
         self.reminder_task = asyncio.create_task(self.check_reminders())
 
+    async def cog_load(self):
+        """Start handling AFK mentions once the cog is loaded"""
+        self.bot.message_hooks.register('afk', self.check_afk, prefilter=self.afk_prefilter)
+
     def cog_unload(self):
         """Clean up when cog is unloaded"""
         self.reminder_task.cancel()
+        self.bot.message_hooks.unregister('afk')
 
     async def cog_before_invoke(self, ctx):
         """Log command before execution"""
@@ -40,19 +49,17 @@ class Utility(commands.Cog):
 
                 for reminder in due_reminders:
                     try:
-                        user = await self.bot.fetch_user(reminder['user_id'])
-
                         embed = reminder_embed(
                             reminder['message'], 
                             datetime.fromisoformat(reminder['created_at'])
                         )
 
-                        await user.send(embed=embed)
-                        await self.bot.db.delete_reminder(reminder['id'])
+                        await self.bot.resolver.send_dm(reminder['user_id'], embed=embed)
+                        await self.bot.db.delete_reminder(reminder['id'], reminder['guild_id'])
 
                     except Exception as e:
                         print(f"Error sending reminder: {e}")
-                        await self.bot.db.delete_reminder(reminder['id'])
+                        await self.bot.db.delete_reminder(reminder['id'], reminder['guild_id'])
 
                 await asyncio.sleep(60)  # Check every minute
 
@@ -60,14 +67,30 @@ class Utility(commands.Cog):
                 print(f"Error in reminder check: {e}")
                 await asyncio.sleep(60)
 
+    def afk_prefilter(self, message) -> bool:
+        """Author is AFK here, or the message mentions someone while anyone is AFK"""
+        index = self.bot.db.afk_index
+        return bool(index) and message.guild is not None and (
+            (message.author.id, message.guild.id) in index or has_mentions(message)
+        )
+
     async def check_afk(self, message):
         """Check for AFK mentions and removals"""
         if not self.afk_check_enabled or not message.guild:
             return
 
         try:
+            # Resolve the author and every mention with a single lookup
+            mentioned = [mention for mention in message.mentions if mention.id != message.author.id]
+            afk_users = await self.bot.db.get_afk_many(
+                [message.author.id, *(mention.id for mention in mentioned)],
+                message.guild.id
+            )
+            if not afk_users:
+                return
+
             # Check if user was AFK and remove it
-            afk_data = await self.bot.db.get_afk(message.author.id, message.guild.id)
+            afk_data = afk_users.get(message.author.id)
             if afk_data:
                 await self.bot.db.remove_afk(message.author.id, message.guild.id)
 
@@ -80,34 +103,25 @@ class Utility(commands.Cog):
 
                 await message.channel.send(embed=embed, delete_after=10)
 
-            # Check for AFK mentions
-            for mention in message.mentions:
-                if mention.id == message.author.id:
-                    continue
-
-                afk_data = await self.bot.db.get_afk(mention.id, message.guild.id)
-                if afk_data:
-                    embed = discord.Embed(
-                        title="💤 User is AFK",
-                        description=f"{mention.mention} is currently AFK",
-                        color=discord.Color.yellow()
-                    )
-                    embed.add_field(
-                        name="Reason",
-                        value=afk_data['reason'],
-                        inline=False
-                    )
-                    embed.add_field(
-                        name="Since",
-                        value=f"<t:{int(datetime.fromisoformat(afk_data['set_at']).timestamp())}:R>",
-                        inline=False
-                    )
-
-                    await message.channel.send(embed=embed, delete_after=15)
+            # One notice for every mentioned AFK user
+            afk_mentions = [(mention, afk_users[mention.id]) for mention in mentioned if mention.id in afk_users]
+            if afk_mentions:
+                window = await self.get_afk_notice_window(message.guild.id)
+                if window > 0:
+                    await self.afk_notices.notify(message.channel, afk_mentions, window)
+                else:
+                    await message.channel.send(embed=afk_mentions_embed(afk_mentions), delete_after=15)
 
         except Exception as e:
             print(f"Error in AFK check: {e}")
 
+    async def get_afk_notice_window(self, guild_id: int) -> int:
+        """Seconds repeat AFK notices are folded together in a guild (0 = never)"""
+        settings = await self.bot.db.get_guild_settings(guild_id)
+        if settings and settings.get('afk_notice_window') is not None:
+            return settings['afk_notice_window']
+        return self.bot.config.afk_notice_window
+
     @commands.command(name='ping')
     async def ping(self, ctx):
         """Check bot's latency"""
@@ -327,9 +341,6 @@ class Utility(commands.Cog):
         except Exception as e:
             await ctx.send(embed=error_embed("Calculation Error", f"Error: {str(e)}"))
 
-async def setup(bot):
-    await bot.add_cog(Utility(bot))
-
     @commands.command(name='shorten')
     async def shorten_url(self, ctx, url):
         """Shorten a URL using TinyURL"""
@@ -594,6 +605,56 @@ async def setup(bot):
         embed = afk_embed(ctx.author, reason, "set")
         await ctx.send(embed=embed)
 
+    @commands.command(name='afknotice')
+    @commands.has_permissions(manage_guild=True)
+    async def afknotice(self, ctx, seconds: int = None):
+        """Show or set how long repeat AFK notices are folded together (0 disables)"""
+        if not ctx.guild:
+            await ctx.send(embed=error_embed("Server Only", "This command can only be used in servers!"))
+            return
+
+        if seconds is None:
+            window = await self.get_afk_notice_window(ctx.guild.id)
+            await ctx.send(embed=info_embed("AFK Notices", f"Repeat AFK notices are folded for **{window}s** per channel"))
+            return
+
+        if seconds < 0 or seconds > 3600:
+            await ctx.send(embed=error_embed("Invalid Window", "Window must be between 0 and 3600 seconds"))
+            return
+
+        await self.bot.db.set_guild_setting(ctx.guild.id, 'afk_notice_window', seconds)
+        if seconds == 0:
+            await ctx.send(embed=success_embed("AFK Notices", "Every AFK mention now gets its own notice"))
+        else:
+            await ctx.send(embed=success_embed("AFK Notices", f"Repeat AFK notices are now folded for {seconds}s per channel"))
+
+    @commands.command(name='prefix')
+    @commands.has_permissions(manage_guild=True)
+    async def prefix(self, ctx, new_prefix: str = None):
+        """Show or change this server's command prefix ("reset" restores the default)"""
+        if not ctx.guild:
+            await ctx.send(embed=error_embed("Server Only", "This command can only be used in servers!"))
+            return
+
+        matcher = self.bot.prefix_matcher
+        if new_prefix is None:
+            current = matcher.display_prefix(ctx.guild.id)
+            await ctx.send(embed=info_embed("Prefix", f"The prefix here is `{current}` (mentioning me works too)"))
+            return
+
+        default = self.bot.config.prefix
+        if new_prefix.lower() == 'reset' or new_prefix == default:
+            new_prefix = None
+        elif len(new_prefix) > 5 or any(char.isspace() for char in new_prefix) or '`' in new_prefix:
+            await ctx.send(embed=error_embed("Invalid Prefix", "Prefix must be 1-5 characters with no spaces or backticks"))
+            return
+
+        await self.bot.db.set_guild_setting(ctx.guild.id, 'prefix', new_prefix)
+        matcher.set_guild_prefix(ctx.guild.id, new_prefix)
+
+        shown = new_prefix or default
+        await ctx.send(embed=success_embed("Prefix Updated", f"Commands in this server now start with `{shown}`"))
+
     @commands.command(name='remind')
     async def remind(self, ctx, time_str, *, message):
         """Set a reminder (e.g., 1h30m, 2d, 45s)"""
@@ -655,7 +716,8 @@ async def setup(bot):
                 "User Report",
                 guild=ctx.guild,
                 user=ctx.author,
-                details=f"Reported {member} for: {reason}"
+                details=f"Reported {member} for: {reason}",
+                category='moderation'
             )
 
     @commands.command(name='suggestions', aliases=['suggest'])
@@ -687,4 +749,4 @@ async def setup(bot):
             pass
 
 async def setup(bot):
-    bot.add_cog(Utility(bot))
\ No newline at end of file
+    await bot.add_cog(Utility(bot))
@@ -20,6 +20,51 @@ class Config:
         self.ticket_auto_archive_hours = 24
         self.max_poll_options = 10
         self.max_reminder_hours = 168  # 7 days
+        self.afk_notice_window = int(os.getenv('AFK_NOTICE_WINDOW', 30))  # seconds, 0 disables coalescing
+        
+        # Database settings
+        self.db_pool_size = int(os.getenv('DB_POOL_SIZE', 4))
+        self.db_shards = int(os.getenv('DB_SHARDS', 1))
+        self.db_write_behind = os.getenv('DB_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+        self.db_flush_interval_ms = int(os.getenv('DB_FLUSH_INTERVAL_MS', 5))
+        self.db_max_batch = int(os.getenv('DB_MAX_BATCH', 100))
+        self.settings_cache_size = int(os.getenv('SETTINGS_CACHE_SIZE', 1000))
+        self.settings_cache_ttl = int(os.getenv('SETTINGS_CACHE_TTL', 300))
+        self.db_slow_query_ms = float(os.getenv('DB_SLOW_QUERY_MS', 100))
+        self.db_slow_query_log = os.getenv('DB_SLOW_QUERY_LOG') or None
+        
+        # Retention settings (days before cold rows are archived; 0 keeps them forever)
+        self.retention_interval_hours = int(os.getenv('RETENTION_INTERVAL_HOURS', 24))
+        self.retention_closed_ticket_days = int(os.getenv('RETENTION_CLOSED_TICKET_DAYS', 90))
+        self.retention_report_days = int(os.getenv('RETENTION_REPORT_DAYS', 180))
+        self.retention_suggestion_days = int(os.getenv('RETENTION_SUGGESTION_DAYS', 365))
+        self.retention_reminder_days = int(os.getenv('RETENTION_REMINDER_DAYS', 7))
+        self.retention_afk_days = int(os.getenv('RETENTION_AFK_DAYS', 30))
+        self.retention_archive_path = os.getenv('RETENTION_ARCHIVE_PATH') or None
+        self.retention_batch_size = int(os.getenv('RETENTION_BATCH_SIZE', 500))
+        
+        # Shared user / DM channel cache
+        self.user_cache_size = int(os.getenv('USER_CACHE_SIZE', 1000))
+        self.user_cache_ttl = int(os.getenv('USER_CACHE_TTL', 3600))
+        
+        # Log delivery queue (overflow: drop_oldest or drop_newest)
+        self.log_queue_size = int(os.getenv('LOG_QUEUE_SIZE', 1000))
+        self.log_queue_overflow = os.getenv('LOG_QUEUE_OVERFLOW', 'drop_oldest')
+        self.log_drain_timeout = float(os.getenv('LOG_DRAIN_TIMEOUT', 10))
+        self.log_batch_interval = float(os.getenv('LOG_BATCH_INTERVAL', 2))  # seconds, 0 sends each embed alone
+        
+        # Local searchable log store (rotating append-only segments)
+        self.log_store_dir = os.getenv('LOG_STORE_DIR', 'log_store')
+        self.log_segment_bytes = int(os.getenv('LOG_SEGMENT_BYTES', 4 * 1024 * 1024))
+        self.log_store_max_segments = int(os.getenv('LOG_STORE_MAX_SEGMENTS', 256))
+        
+        # Error fingerprinting
+        self.error_digest_minutes = int(os.getenv('ERROR_DIGEST_MINUTES', 60))
+        self.error_fingerprints_max = int(os.getenv('ERROR_FINGERPRINTS_MAX', 500))
+        
+        # Backup settings
+        self.backup_dir = os.getenv('BACKUP_DIR', 'backups')
+        self.backup_pages_per_step = int(os.getenv('BACKUP_PAGES_PER_STEP', 64))
         
     def validate(self) -> bool:
         """Validate required configuration"""
@@ -1,123 +1,265 @@
 import sqlite3
 import asyncio
-import json
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-import aiosqlite
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Iterable
+
+from instrumentation import QueryMetrics, instrumented
+from records import Record, GuildSettings, Ticket, AfkEntry, Reminder, RetentionPolicy
+from storage import ConnectionPool, StorageBackend, WriteOp, create_backend
+from utils.cache import TTLCache
+
+# Hot-path queries, registered here so their plans can be inspected
+QUERIES = {
+    'get_guild_settings': f'SELECT {GuildSettings.columns()} FROM guild_settings WHERE guild_id = ?',
+    'get_ticket': f'SELECT {Ticket.columns()} FROM tickets WHERE channel_id = ?',
+    'get_user_tickets': f"SELECT {Ticket.columns()} FROM tickets WHERE user_id = ? AND guild_id = ? AND status = 'open'",
+    'get_ticket_stats': 'SELECT total_count, open_count, closed_count FROM ticket_counters WHERE guild_id = ?',
+    'count_tickets': (
+        "SELECT guild_id, COUNT(*), SUM(status = 'open'), SUM(status = 'closed') "
+        "FROM tickets WHERE guild_id IS NOT NULL GROUP BY guild_id"
+    ),
+    'get_afk': f'SELECT {AfkEntry.columns()} FROM afk_users WHERE user_id = ? AND guild_id = ?',
+    'remove_afk': 'DELETE FROM afk_users WHERE user_id = ? AND guild_id = ?',
+    'get_due_reminders': f'SELECT {Reminder.columns()} FROM reminders WHERE remind_at <= ?',
+    'delete_reminder': 'DELETE FROM reminders WHERE id = ?'
+}
+
+# Retention policy columns, keyed by the name used in commands
+RETENTION_FIELDS = {
+    'tickets': 'closed_ticket_days',
+    'reports': 'report_days',
+    'suggestions': 'suggestion_days',
+    'reminders': 'reminder_days',
+    'afk': 'afk_days'
+}
+
+# Columns update_ticket/update_tickets may change
+TICKET_UPDATE_COLUMNS = frozenset({'staff_id', 'category', 'status', 'closed_at', 'messages_count'})
+
+# Stay well below SQLite's bound-parameter limit for IN (...) lists
+_MAX_SQL_PARAMS = 500
+
+def _ticket_update_columns(kwargs: Dict[str, Any]) -> tuple:
+    """Validate ticket update columns, returning them in a canonical order with their values"""
+    if not kwargs:
+        raise ValueError("No ticket columns to update")
+    
+    invalid = set(kwargs) - TICKET_UPDATE_COLUMNS
+    if invalid:
+        raise ValueError(f"Cannot update ticket column(s): {', '.join(sorted(invalid))}")
+    
+    columns = tuple(sorted(kwargs))
+    return columns, tuple(kwargs[column] for column in columns)
+
+@lru_cache(maxsize=64)
+def _ticket_update_sql(columns: tuple) -> str:
+    """UPDATE statement for a set of ticket columns (cached per column set)"""
+    assignments = ', '.join(f'{column} = ?' for column in columns)
+    return f'UPDATE tickets SET {assignments} WHERE channel_id = ?'
+
+# The statement update_ticket builds when a ticket is closed
+QUERIES['update_ticket'] = _ticket_update_sql(('closed_at', 'status'))
+
+def _explain_params(sql: str) -> tuple:
+    """Placeholder parameters for explaining a query"""
+    return (0,) * sql.count('?')
+
+def explain_query(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """Get the EXPLAIN QUERY PLAN details for a query"""
+    rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', _explain_params(sql)).fetchall()
+    return [row[3] for row in rows]
 
 class Database:
     """Database management for the bot"""
     
-    def __init__(self, db_path: str = "spark_utility.db"):
+    def __init__(self, db_path: str = "spark_utility.db", pool_size: int = 4,
+                 write_behind: bool = False, flush_interval: float = 0.005, max_batch: int = 100,
+                 settings_cache_size: int = 1000, settings_cache_ttl: float = 300.0,
+                 shards: int = 1, backend: Optional[StorageBackend] = None,
+                 slow_query_ms: float = 100.0):
         self.db_path = db_path
+        self.backend = backend or create_backend(
+            db_path, shards,
+            readers=pool_size,
+            write_behind=write_behind,
+            flush_interval=flush_interval,
+            max_batch=max_batch
+        )
+        self.sharded = len(self.backend.pools) > 1
+        self._is_open = False
+        # Set by close(); a closed Database is not reopened by later queries
+        self._closed = False
+        self._connect_lock = asyncio.Lock()
+        self.bootstrap_stats: Dict[str, Any] = {}
+        
+        # Parsed guild settings, including "no settings" results
+        self.settings_cache = TTLCache(settings_cache_size, settings_cache_ttl)
+        # Ticket channel -> shard index, for lookups that only know the channel
+        self._ticket_shards = TTLCache(10000, 24 * 3600)
+        # Per-method latency / row / lock-wait statistics and slow-query threshold
+        self.metrics = QueryMetrics(slow_query_ms)
+        # Every AFK entry, keyed by (user_id, guild_id); loaded on connect and
+        # kept in step by set_afk/remove_afk so AFK checks never hit SQLite
+        self.afk_index: Dict[tuple, AfkEntry] = {}
     
-    def init_db(self):
-        """Initialize database tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+    async def connect(self) -> Dict[str, Any]:
+        """Bring the schema up to date and open the persistent connection pools
+        
+        Runs once; queries issued while it is in progress wait for it. Returns
+        per-phase timings in milliseconds and the migrations applied per file.
+        Raises RuntimeError once the database has been closed.
+        """
+        async with self._connect_lock:
+            if self._closed:
+                raise RuntimeError("Database is closed")
+            if self._is_open:
+                return self.bootstrap_stats
             
-            # Guild settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS guild_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    log_channel_id INTEGER,
-                    ticket_category_id INTEGER,
-                    staff_role_ids TEXT,
-                    ticket_log_channel_id INTEGER,
-                    auto_archive_hours INTEGER DEFAULT 24,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tickets table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tickets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    channel_id INTEGER,
-                    user_id INTEGER,
-                    staff_id INTEGER,
-                    category TEXT,
-                    status TEXT DEFAULT 'open',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    closed_at TIMESTAMP,
-                    messages_count INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # AFK table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS afk_users (
-                    user_id INTEGER PRIMARY KEY,
-                    guild_id INTEGER,
-                    reason TEXT,
-                    set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Reminders table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS reminders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    guild_id INTEGER,
-                    channel_id INTEGER,
-                    message TEXT,
-                    remind_at TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Reports table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    reporter_id INTEGER,
-                    reported_id INTEGER,
-                    reason TEXT,
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Suggestions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS suggestions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    suggestion TEXT,
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            start = time.perf_counter()
+            applied = await self.backend.init_schema_async()
+            schema_done = time.perf_counter()
+            await self.backend.open()
+            pools_done = time.perf_counter()
+            await self._load_afk_index()
+            self._is_open = True
             
-            conn.commit()
+            self.bootstrap_stats = {
+                'schema_ms': round((schema_done - start) * 1000, 1),
+                'pools_ms': round((pools_done - schema_done) * 1000, 1),
+                'afk_index_ms': round((time.perf_counter() - pools_done) * 1000, 1),
+                'afk_entries': len(self.afk_index),
+                'applied': {path: versions for path, versions in applied.items() if versions}
+            }
+            return self.bootstrap_stats
     
-    async def get_guild_settings(self, guild_id: int) -> Optional[Dict]:
-        """Get guild settings"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                'SELECT * FROM guild_settings WHERE guild_id = ?',
-                (guild_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return {
-                        'guild_id': row[0],
-                        'log_channel_id': row[1],
-                        'ticket_category_id': row[2],
-                        'staff_role_ids': json.loads(row[3]) if row[3] else [],
-                        'ticket_log_channel_id': row[4],
-                        'auto_archive_hours': row[5],
-                        'created_at': row[6]
-                    }
-                return None
+    async def _load_afk_index(self):
+        """Read every AFK entry into memory"""
+        index = {}
+        for pool in self.backend.pools:
+            async with pool.reader() as db:
+                async with db.execute(f'SELECT {AfkEntry.columns()} FROM afk_users') as cursor:
+                    cursor.row_factory = AfkEntry.row_factory
+                    for entry in await cursor.fetchall():
+                        index[(entry.user_id, entry.guild_id)] = entry
+        self.afk_index = index
+    
+    async def close(self):
+        """Flush pending writes and close the connection pools for good"""
+        self._closed = True
+        self._is_open = False
+        await self.backend.close()
+    
+    async def flush(self):
+        """Wait for all queued writes to be committed"""
+        await self.backend.flush()
+    
+    def pool_stats(self) -> Dict:
+        """Get connection pool statistics per database file"""
+        return self.backend.get_stats()
+    
+    def query_stats(self) -> Dict[str, Dict]:
+        """Get latency percentiles, row counts and lock wait per method"""
+        return self.metrics.snapshot()
+    
+    def cache_stats(self) -> Dict:
+        """Get in-process cache statistics"""
+        return {'guild_settings': self.settings_cache.get_stats()}
+    
+    def _pool(self, guild_id: Optional[int]) -> ConnectionPool:
+        """Pool holding a guild's rows"""
+        return self.backend.pool_for(guild_id)
+    
+    @asynccontextmanager
+    async def _reader(self, pool: ConnectionPool):
+        """Reader connection, bootstrapping the database on first use"""
+        if not self._is_open:
+            await self.connect()
+        async with pool.reader() as db:
+            yield db
     
+    async def _fetch_one(self, pool: ConnectionPool, sql: str, params: tuple, record: type) -> Optional[Record]:
+        """Run a query and build a single record from the first row"""
+        async with self._reader(pool) as db:
+            async with db.execute(sql, params) as cursor:
+                cursor.row_factory = record.row_factory
+                return await cursor.fetchone()
+    
+    async def _fetch_all(self, pool: ConnectionPool, sql: str, params: tuple, record: type) -> List[Record]:
+        """Run a query and build a record for every row"""
+        async with self._reader(pool) as db:
+            async with db.execute(sql, params) as cursor:
+                cursor.row_factory = record.row_factory
+                return await cursor.fetchall()
+    
+    async def _write(self, pool: ConnectionPool, op: WriteOp, wait: bool = True) -> Any:
+        """Run a write operation, bootstrapping the database on first use"""
+        if not self._is_open:
+            await self.connect()
+        return await pool.write(op, wait)
+    
+    async def _write_nowait(self, pool: ConnectionPool, op: WriteOp):
+        """Write whose result the caller does not need
+        
+        Without write-behind this still waits, so errors reach the caller.
+        With write-behind it only queues the operation: it commits with the
+        next batch and a failure is logged rather than raised.
+        """
+        await self._write(pool, op, wait=not pool.write_behind)
+    
+    async def _pool_for_channel(self, channel_id: int) -> Optional[ConnectionPool]:
+        """Pool holding the ticket for a channel, or None if no shard has it"""
+        pools = self.backend.pools
+        if not self.sharded:
+            return pools[0]
+        
+        found, index = self._ticket_shards.lookup(channel_id)
+        if found:
+            return pools[index]
+        
+        async def has_ticket(pool):
+            async with self._reader(pool) as db:
+                async with db.execute('SELECT 1 FROM tickets WHERE channel_id = ? LIMIT 1', (channel_id,)) as cursor:
+                    return await cursor.fetchone() is not None
+        
+        hits = await asyncio.gather(*(has_ticket(pool) for pool in pools))
+        for index, hit in enumerate(hits):
+            if hit:
+                self._ticket_shards.set(channel_id, index)
+                return pools[index]
+        return None
+    
+    def init_db(self) -> Dict[str, List[int]]:
+        """Apply pending migrations synchronously (scripts; the bot uses connect)"""
+        return self.backend.init_schema()
+    
+    async def explain_queries(self) -> Dict[str, List[str]]:
+        """Get the EXPLAIN QUERY PLAN output for every registered query"""
+        plans = {}
+        async with self._reader(self.backend.pools[0]) as db:
+            for name, sql in QUERIES.items():
+                async with db.execute(f'EXPLAIN QUERY PLAN {sql}', _explain_params(sql)) as cursor:
+                    plans[name] = [row[3] for row in await cursor.fetchall()]
+        return plans
+    
+    @instrumented
+    async def get_guild_settings(self, guild_id: int) -> Optional[GuildSettings]:
+        """Get guild settings (served from the settings cache when possible)"""
+        found, settings = self.settings_cache.lookup(guild_id)
+        if found:
+            return settings
+        
+        generation = self.settings_cache.generation
+        settings = await self._fetch_one(self._pool(guild_id), QUERIES['get_guild_settings'], (guild_id,), GuildSettings)
+        self.settings_cache.set(guild_id, settings, generation=generation)
+        return settings
+    
+    @instrumented
     async def set_guild_setting(self, guild_id: int, setting: str, value: Any):
         """Set a guild setting"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             # Check if guild exists
             async with db.execute(
                 'SELECT 1 FROM guild_settings WHERE guild_id = ?',
@@ -135,201 +277,395 @@ class Database:
                     f'INSERT INTO guild_settings (guild_id, {setting}) VALUES (?, ?)',
                     (guild_id, value)
                 )
-            
-            await db.commit()
+        
+        self.settings_cache.invalidate(guild_id)
+        try:
+            await self._write(self._pool(guild_id), op)
+        finally:
+            self.settings_cache.invalidate(guild_id)
+    
+    @instrumented
+    async def set_log_webhook(self, guild_id: int, webhook_id: Optional[int], token: Optional[str]):
+        """Remember (or with None, forget) the webhook used for a guild's log channel"""
+        async def op(db):
+            await db.execute(
+                'INSERT INTO guild_settings (guild_id, log_webhook_id, log_webhook_token) VALUES (?, ?, ?) '
+                'ON CONFLICT (guild_id) DO UPDATE SET '
+                'log_webhook_id = excluded.log_webhook_id, log_webhook_token = excluded.log_webhook_token',
+                (guild_id, webhook_id, token)
+            )
+        
+        self.settings_cache.invalidate(guild_id)
+        try:
+            await self._write(self._pool(guild_id), op)
+        finally:
+            self.settings_cache.invalidate(guild_id)
+    
+    @instrumented
+    async def get_logging_policies(self) -> List[GuildSettings]:
+        """Get the settings of every guild with a logging policy"""
+        settings = []
+        for pool in self.backend.pools:
+            settings.extend(await self._fetch_all(
+                pool,
+                f'SELECT {GuildSettings.columns()} FROM guild_settings '
+                'WHERE log_level IS NOT NULL OR log_sampling IS NOT NULL OR log_disabled_categories IS NOT NULL',
+                (),
+                GuildSettings
+            ))
+        return settings
+    
+    @instrumented
+    async def get_guild_prefixes(self) -> Dict[int, str]:
+        """Get every custom command prefix, keyed by guild"""
+        prefixes = {}
+        for pool in self.backend.pools:
+            async with self._reader(pool) as db:
+                async with db.execute(
+                    'SELECT guild_id, prefix FROM guild_settings WHERE prefix IS NOT NULL'
+                ) as cursor:
+                    prefixes.update(await cursor.fetchall())
+        return prefixes
+    
+    @instrumented
+    async def get_retention_policy(self, guild_id: int) -> Optional[RetentionPolicy]:
+        """Get a guild's retention overrides"""
+        return await self._fetch_one(
+            self._pool(guild_id),
+            f'SELECT {RetentionPolicy.columns()} FROM retention_policies WHERE guild_id = ?',
+            (guild_id,),
+            RetentionPolicy
+        )
+    
+    @instrumented
+    async def set_retention_policy(self, guild_id: int, field: str, days: Optional[int]):
+        """Override one retention period for a guild (None restores the default)"""
+        if field not in RETENTION_FIELDS.values():
+            raise ValueError(f"Unknown retention field: {field}")
+        
+        async def op(db):
+            await db.execute(
+                f'INSERT INTO retention_policies (guild_id, {field}) VALUES (?, ?) '
+                f'ON CONFLICT (guild_id) DO UPDATE SET {field} = excluded.{field}',
+                (guild_id, days)
+            )
+        
+        await self._write(self._pool(guild_id), op)
     
+    @instrumented
     async def create_ticket(self, guild_id: int, channel_id: int, user_id: int, category: str) -> int:
         """Create a new ticket"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             async with db.execute(
                 'INSERT INTO tickets (guild_id, channel_id, user_id, category) VALUES (?, ?, ?, ?)',
                 (guild_id, channel_id, user_id, category)
             ) as cursor:
                 ticket_id = cursor.lastrowid
-                await db.commit()
-                return ticket_id
+            
+            await db.execute(
+                'INSERT INTO ticket_counters (guild_id, total_count, open_count) VALUES (?, 1, 1) '
+                'ON CONFLICT (guild_id) DO UPDATE SET '
+                'total_count = total_count + 1, open_count = open_count + 1',
+                (guild_id,)
+            )
+            return ticket_id
+        
+        pool = self._pool(guild_id)
+        ticket_id = await self._write(pool, op)
+        if self.sharded:
+            self._ticket_shards.set(channel_id, self.backend.pools.index(pool))
+        return ticket_id
     
-    async def get_ticket(self, channel_id: int) -> Optional[Dict]:
+    @instrumented
+    async def get_ticket(self, channel_id: int) -> Optional[Ticket]:
         """Get ticket by channel ID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                'SELECT * FROM tickets WHERE channel_id = ?',
-                (channel_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return {
-                        'id': row[0],
-                        'guild_id': row[1],
-                        'channel_id': row[2],
-                        'user_id': row[3],
-                        'staff_id': row[4],
-                        'category': row[5],
-                        'status': row[6],
-                        'created_at': row[7],
-                        'closed_at': row[8],
-                        'messages_count': row[9]
-                    }
-                return None
+        pool = await self._pool_for_channel(channel_id)
+        if pool is None:
+            return None
+        return await self._fetch_one(pool, QUERIES['get_ticket'], (channel_id,), Ticket)
     
+    @instrumented
     async def update_ticket(self, channel_id: int, **kwargs):
-        """Update ticket information"""
-        async with aiosqlite.connect(self.db_path) as db:
-            for key, value in kwargs.items():
+        """Update ticket information in a single statement"""
+        columns, values = _ticket_update_columns(kwargs)
+        sql = _ticket_update_sql(columns)
+        
+        async def op(db):
+            previous = await self._ticket_statuses(db, [channel_id]) if 'status' in kwargs else []
+            await db.execute(sql, (*values, channel_id))
+            await self._adjust_ticket_counters(db, previous, kwargs.get('status'))
+        
+        pool = await self._pool_for_channel(channel_id)
+        if pool is not None:
+            await self._write_nowait(pool, op)
+    
+    @instrumented(rowcount=True)
+    async def update_tickets(self, channel_ids: List[int], **kwargs) -> int:
+        """Apply the same update to many tickets with one prepared statement, returning rows updated"""
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            return 0
+        
+        columns, values = _ticket_update_columns(kwargs)
+        sql = _ticket_update_sql(columns)
+        
+        # One statement batch per shard holding the tickets
+        by_pool = {}
+        for channel_id in channel_ids:
+            pool = await self._pool_for_channel(channel_id)
+            if pool is not None:
+                by_pool.setdefault(pool, []).append(channel_id)
+        
+        def make_op(pool_channel_ids):
+            async def op(db):
+                previous = await self._ticket_statuses(db, pool_channel_ids) if 'status' in kwargs else []
+                async with db.executemany(sql, [(*values, channel_id) for channel_id in pool_channel_ids]) as cursor:
+                    updated = cursor.rowcount
+                await self._adjust_ticket_counters(db, previous, kwargs.get('status'))
+                return updated
+            return op
+        
+        updated = await asyncio.gather(*(
+            self._write(pool, make_op(pool_channel_ids)) for pool, pool_channel_ids in by_pool.items()
+        ))
+        return sum(updated)
+    
+    @instrumented(rowcount=True)
+    async def close_guild_tickets(self, guild_id: int, closed_at: Optional[datetime] = None) -> int:
+        """Close every open ticket in a guild, returning how many were closed"""
+        closed_at = closed_at or datetime.utcnow()
+        
+        async def op(db):
+            async with db.execute(
+                "UPDATE tickets SET status = 'closed', closed_at = ? WHERE guild_id = ? AND status = 'open'",
+                (closed_at, guild_id)
+            ) as cursor:
+                closed = cursor.rowcount
+            
+            if closed:
                 await db.execute(
-                    f'UPDATE tickets SET {key} = ? WHERE channel_id = ?',
-                    (value, channel_id)
+                    'UPDATE ticket_counters SET open_count = open_count - ?, closed_count = closed_count + ? '
+                    'WHERE guild_id = ?',
+                    (closed, closed, guild_id)
                 )
-            await db.commit()
+            return closed
+        
+        return await self._write(self._pool(guild_id), op)
     
-    async def get_user_tickets(self, user_id: int, guild_id: int) -> List[Dict]:
-        """Get all open tickets for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
+    @staticmethod
+    async def _ticket_statuses(db, channel_ids: List[int]) -> List[tuple]:
+        """Current (guild_id, status) of the tickets in the given channels"""
+        rows = []
+        for i in range(0, len(channel_ids), _MAX_SQL_PARAMS):
+            chunk = channel_ids[i:i + _MAX_SQL_PARAMS]
             async with db.execute(
-                'SELECT * FROM tickets WHERE user_id = ? AND guild_id = ? AND status = "open"',
-                (user_id, guild_id)
+                f"SELECT guild_id, status FROM tickets WHERE channel_id IN ({', '.join('?' * len(chunk))})",
+                chunk
             ) as cursor:
-                rows = await cursor.fetchall()
-                return [
-                    {
-                        'id': row[0],
-                        'guild_id': row[1],
-                        'channel_id': row[2],
-                        'user_id': row[3],
-                        'staff_id': row[4],
-                        'category': row[5],
-                        'status': row[6],
-                        'created_at': row[7],
-                        'closed_at': row[8],
-                        'messages_count': row[9]
-                    }
-                    for row in rows
-                ]
+                rows.extend(await cursor.fetchall())
+        return rows
+    
+    @staticmethod
+    async def _adjust_ticket_counters(db, previous: List[tuple], new_status: Optional[str]):
+        """Move tickets between the open/closed counters after a status change"""
+        deltas = {}
+        for guild_id, old_status in previous:
+            if old_status == new_status:
+                continue
+            open_delta, closed_delta = deltas.get(guild_id, (0, 0))
+            deltas[guild_id] = (
+                open_delta + (new_status == 'open') - (old_status == 'open'),
+                closed_delta + (new_status == 'closed') - (old_status == 'closed')
+            )
+        
+        if deltas:
+            await db.executemany(
+                'UPDATE ticket_counters SET open_count = open_count + ?, closed_count = closed_count + ? '
+                'WHERE guild_id = ?',
+                [(open_delta, closed_delta, guild_id) for guild_id, (open_delta, closed_delta) in deltas.items()]
+            )
+    
+    @instrumented
+    async def get_user_tickets(self, user_id: int, guild_id: int) -> List[Ticket]:
+        """Get all open tickets for a user"""
+        return await self._fetch_all(self._pool(guild_id), QUERIES['get_user_tickets'], (user_id, guild_id), Ticket)
     
+    @instrumented
     async def get_ticket_stats(self, guild_id: int) -> Dict:
         """Get ticket statistics for a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Total tickets
-            async with db.execute(
-                'SELECT COUNT(*) FROM tickets WHERE guild_id = ?',
-                (guild_id,)
-            ) as cursor:
-                total_tickets = (await cursor.fetchone())[0]
-            
-            # Open tickets
+        async with self._reader(self._pool(guild_id)) as db:
             async with db.execute(
-                'SELECT COUNT(*) FROM tickets WHERE guild_id = ? AND status = "open"',
+                QUERIES['get_ticket_stats'],
                 (guild_id,)
             ) as cursor:
-                open_tickets = (await cursor.fetchone())[0]
-            
-            # Closed tickets
+                row = await cursor.fetchone()
+        
+        total_tickets, open_tickets, closed_tickets = row if row else (0, 0, 0)
+        return {
+            'total': total_tickets,
+            'open': open_tickets,
+            'closed': closed_tickets
+        }
+    
+    @instrumented
+    async def verify_ticket_counters(self) -> Dict[int, Dict]:
+        """Compare ticket counters with a fresh count, returning the guilds that drifted"""
+        actual, stored = {}, {}
+        for pool in self.backend.pools:
+            async with self._reader(pool) as db:
+                async with db.execute(QUERIES['count_tickets']) as cursor:
+                    actual.update({row[0]: tuple(row[1:]) for row in await cursor.fetchall()})
+                async with db.execute(
+                    'SELECT guild_id, total_count, open_count, closed_count FROM ticket_counters'
+                ) as cursor:
+                    stored.update({row[0]: tuple(row[1:]) for row in await cursor.fetchall()})
+        
+        drift = {}
+        for guild_id in actual.keys() | stored.keys():
+            expected = actual.get(guild_id, (0, 0, 0))
+            counted = stored.get(guild_id, (0, 0, 0))
+            if expected != counted:
+                drift[guild_id] = {'expected': expected, 'stored': counted}
+        return drift
+    
+    @instrumented(rowcount=True)
+    async def rebuild_ticket_counters(self) -> int:
+        """Recompute all ticket counters with a single GROUP BY pass"""
+        async def op(db):
+            await db.execute('DELETE FROM ticket_counters')
             async with db.execute(
-                'SELECT COUNT(*) FROM tickets WHERE guild_id = ? AND status = "closed"',
-                (guild_id,)
+                'INSERT INTO ticket_counters (guild_id, total_count, open_count, closed_count) '
+                + QUERIES['count_tickets']
             ) as cursor:
-                closed_tickets = (await cursor.fetchone())[0]
-            
-            return {
-                'total': total_tickets,
-                'open': open_tickets,
-                'closed': closed_tickets
-            }
+                return cursor.rowcount
+        
+        rebuilt = await asyncio.gather(*(self._write(pool, op) for pool in self.backend.pools))
+        return sum(rebuilt)
     
+    @instrumented
     async def set_afk(self, user_id: int, guild_id: int, reason: str):
         """Set user as AFK"""
-        async with aiosqlite.connect(self.db_path) as db:
+        if not self._is_open:
+            await self.connect()
+        
+        set_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        previous = self.afk_index.get((user_id, guild_id))
+        self.afk_index[(user_id, guild_id)] = AfkEntry(user_id, guild_id, reason, set_at)
+        
+        async def op(db):
             await db.execute(
-                'INSERT OR REPLACE INTO afk_users (user_id, guild_id, reason) VALUES (?, ?, ?)',
-                (user_id, guild_id, reason)
+                'INSERT OR REPLACE INTO afk_users (user_id, guild_id, reason, set_at) VALUES (?, ?, ?, ?)',
+                (user_id, guild_id, reason, set_at)
             )
-            await db.commit()
+        
+        try:
+            await self._write_nowait(self._pool(guild_id), op)
+        except BaseException:
+            self._restore_afk_entry((user_id, guild_id), previous)
+            raise
     
-    async def get_afk(self, user_id: int, guild_id: int) -> Optional[Dict]:
-        """Get AFK status for user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                'SELECT * FROM afk_users WHERE user_id = ? AND guild_id = ?',
-                (user_id, guild_id)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return {
-                        'user_id': row[0],
-                        'guild_id': row[1],
-                        'reason': row[2],
-                        'set_at': row[3]
-                    }
-                return None
+    @instrumented
+    async def get_afk(self, user_id: int, guild_id: int) -> Optional[AfkEntry]:
+        """Get AFK status for user (from the in-memory index)"""
+        if not self._is_open:
+            await self.connect()
+        return self.afk_index.get((user_id, guild_id))
     
+    @instrumented
+    async def get_afk_many(self, user_ids: Iterable[int], guild_id: int) -> Dict[int, AfkEntry]:
+        """Get the AFK entries of several users in one guild, keyed by user id (only AFK users are included)"""
+        if not self._is_open:
+            await self.connect()
+        index = self.afk_index
+        entries = {}
+        for user_id in user_ids:
+            entry = index.get((user_id, guild_id))
+            if entry is not None:
+                entries[user_id] = entry
+        return entries
+    
+    @instrumented
     async def remove_afk(self, user_id: int, guild_id: int):
         """Remove AFK status"""
-        async with aiosqlite.connect(self.db_path) as db:
+        if not self._is_open:
+            await self.connect()
+        previous = self.afk_index.pop((user_id, guild_id), None)
+        
+        async def op(db):
             await db.execute(
-                'DELETE FROM afk_users WHERE user_id = ? AND guild_id = ?',
+                QUERIES['remove_afk'],
                 (user_id, guild_id)
             )
-            await db.commit()
+        
+        try:
+            await self._write_nowait(self._pool(guild_id), op)
+        except BaseException:
+            self._restore_afk_entry((user_id, guild_id), previous)
+            raise
+    
+    def _restore_afk_entry(self, key: tuple, entry: Optional[AfkEntry]):
+        """Put back the AFK entry a failed write replaced, keeping the index in step with SQLite"""
+        if entry is None:
+            self.afk_index.pop(key, None)
+        else:
+            self.afk_index[key] = entry
     
+    @instrumented
     async def add_reminder(self, user_id: int, guild_id: int, channel_id: int, message: str, remind_at: datetime) -> int:
         """Add a reminder"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             async with db.execute(
                 'INSERT INTO reminders (user_id, guild_id, channel_id, message, remind_at) VALUES (?, ?, ?, ?, ?)',
                 (user_id, guild_id, channel_id, message, remind_at)
             ) as cursor:
-                reminder_id = cursor.lastrowid
-                await db.commit()
-                return reminder_id
+                return cursor.lastrowid
+        
+        return await self._write(self._pool(guild_id), op)
     
-    async def get_due_reminders(self) -> List[Dict]:
+    @instrumented
+    async def get_due_reminders(self) -> List[Reminder]:
         """Get all due reminders"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                'SELECT * FROM reminders WHERE remind_at <= ?',
-                (datetime.utcnow(),)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [
-                    {
-                        'id': row[0],
-                        'user_id': row[1],
-                        'guild_id': row[2],
-                        'channel_id': row[3],
-                        'message': row[4],
-                        'remind_at': row[5],
-                        'created_at': row[6]
-                    }
-                    for row in rows
-                ]
-    
-    async def delete_reminder(self, reminder_id: int):
-        """Delete a reminder"""
-        async with aiosqlite.connect(self.db_path) as db:
+        now = datetime.utcnow()
+        results = await asyncio.gather(*(
+            self._fetch_all(pool, QUERIES['get_due_reminders'], (now,), Reminder)
+            for pool in self.backend.pools
+        ))
+        return [reminder for reminders in results for reminder in reminders]
+    
+    @instrumented
+    async def delete_reminder(self, reminder_id: int, guild_id: Optional[int] = None):
+        """Delete a reminder (reminder ids are per shard, so sharded storage needs the guild id)"""
+        if self.sharded and guild_id is None:
+            raise ValueError("guild_id is required to delete a reminder from sharded storage")
+        
+        async def op(db):
             await db.execute(
-                'DELETE FROM reminders WHERE id = ?',
+                QUERIES['delete_reminder'],
                 (reminder_id,)
             )
-            await db.commit()
+        
+        await self._write_nowait(self._pool(guild_id), op)
     
+    @instrumented
     async def add_report(self, guild_id: int, reporter_id: int, reported_id: int, reason: str) -> int:
         """Add a report"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             async with db.execute(
                 'INSERT INTO reports (guild_id, reporter_id, reported_id, reason) VALUES (?, ?, ?, ?)',
                 (guild_id, reporter_id, reported_id, reason)
             ) as cursor:
-                report_id = cursor.lastrowid
-                await db.commit()
-                return report_id
+                return cursor.lastrowid
+        
+        return await self._write(self._pool(guild_id), op)
     
+    @instrumented
     async def add_suggestion(self, guild_id: int, user_id: int, suggestion: str) -> int:
         """Add a suggestion"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             async with db.execute(
                 'INSERT INTO suggestions (guild_id, user_id, suggestion) VALUES (?, ?, ?)',
                 (guild_id, user_id, suggestion)
             ) as cursor:
-                suggestion_id = cursor.lastrowid
-                await db.commit()
-                return suggestion_id
+                return cursor.lastrowid
+        
+        return await self._write(self._pool(guild_id), op)
@@ -0,0 +1,184 @@
+import functools
+import inspect
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Any
+
+# Seconds the current Database call has spent waiting for a connection or
+# the writer; ConnectionPool adds to it, the instrumented wrapper reads it
+lock_wait: ContextVar[Optional[List[float]]] = ContextVar('lock_wait', default=None)
+
+# Parameters whose values are user-written text or secrets; never logged verbatim
+SENSITIVE_PARAMS = frozenset({'reason', 'message', 'suggestion', 'value', 'token', 'webhook_url'})
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+slow_query_logger = logging.getLogger('spark.slow_queries')
+
+def add_lock_wait(seconds: float):
+    """Charge wait time to the Database call running in this context"""
+    waits = lock_wait.get()
+    if waits is not None:
+        waits[0] += seconds
+
+def redact(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of call parameters that is safe to write to a log"""
+    safe = {}
+    for name, value in params.items():
+        if name in SENSITIVE_PARAMS and value is not None:
+            safe[name] = f"<redacted {len(str(value))} chars>"
+        elif isinstance(value, (list, tuple)) and len(value) > 10:
+            safe[name] = f"<{len(value)} items>"
+        else:
+            safe[name] = value
+    return safe
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, capped at the max seen"""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+class MethodStats:
+    """Counters for one Database method"""
+
+    __slots__ = ('latency', 'errors', 'rows', 'lock_wait_ms', 'max_lock_wait_ms', 'slow')
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.rows = 0
+        self.lock_wait_ms = 0.0
+        self.max_lock_wait_ms = 0.0
+        self.slow = 0
+
+class QueryMetrics:
+    """Per-method latency, row count and lock-wait statistics for Database"""
+
+    def __init__(self, slow_query_ms: float = 100.0):
+        self.slow_query_ms = slow_query_ms
+        self.methods: Dict[str, MethodStats] = {}
+
+    def record(self, method: str, elapsed_ms: float, rows: int, wait_ms: float, failed: bool) -> bool:
+        """Record one call, returning True if it was slow"""
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = self.methods[method] = MethodStats()
+
+        stats.latency.add(elapsed_ms)
+        stats.rows += rows
+        stats.lock_wait_ms += wait_ms
+        stats.max_lock_wait_ms = max(stats.max_lock_wait_ms, wait_ms)
+        if failed:
+            stats.errors += 1
+
+        slow = self.slow_query_ms > 0 and elapsed_ms >= self.slow_query_ms
+        if slow:
+            stats.slow += 1
+        return slow
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Percentiles and totals per method, slowest p95 first"""
+        result = {}
+        for method, stats in self.methods.items():
+            latency = stats.latency
+            result[method] = {
+                'calls': latency.count,
+                'errors': stats.errors,
+                'slow': stats.slow,
+                'rows': stats.rows,
+                'avg_ms': round(latency.total / latency.count, 3) if latency.count else 0.0,
+                'p50_ms': round(latency.percentile(50), 3),
+                'p95_ms': round(latency.percentile(95), 3),
+                'p99_ms': round(latency.percentile(99), 3),
+                'max_ms': round(latency.max, 3),
+                'lock_wait_ms': round(stats.lock_wait_ms, 3),
+                'max_lock_wait_ms': round(stats.max_lock_wait_ms, 3)
+            }
+        return dict(sorted(result.items(), key=lambda item: item[1]['p95_ms'], reverse=True))
+
+    def reset(self):
+        """Drop every recorded statistic"""
+        self.methods.clear()
+
+def _row_count(result: Any, rowcount: bool) -> int:
+    """Rows a call returned (or affected, for methods returning a count)"""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if rowcount and isinstance(result, int):
+        return result
+    return 1
+
+def instrumented(method=None, *, rowcount: bool = False):
+    """Record latency, rows and lock wait for an async Database method
+
+    ``rowcount=True`` marks methods whose integer result is a number of
+    affected rows rather than an id.
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            waits = [0.0]
+            token = lock_wait.set(waits)
+            start = time.perf_counter()
+            failed = False
+            result = None
+            try:
+                result = await func(self, *args, **kwargs)
+                return result
+            except Exception:
+                failed = True
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                lock_wait.reset(token)
+                # Nested Database calls also count towards the caller's wait
+                add_lock_wait(waits[0])
+
+                wait_ms = waits[0] * 1000
+                if self.metrics.record(name, elapsed_ms, _row_count(result, rowcount), wait_ms, failed):
+                    bound = signature.bind_partial(self, *args, **kwargs)
+                    params = {key: value for key, value in bound.arguments.items() if key != 'self'}
+                    params.update(params.pop('kwargs', {}))
+                    slow_query_logger.warning(
+                        f"{name} took {elapsed_ms:.1f}ms (lock wait {wait_ms:.1f}ms"
+                        f"{', failed' if failed else ''}) params={redact(params)}"
+                    )
+
+        return wrapper
+
+    if method is not None:
+        return decorate(method)
+    return decorate
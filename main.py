@@ -1,4 +1,5 @@
 import os
+import time
 import asyncio
 import traceback
 import threading
@@ -11,6 +12,9 @@ from flask import Flask
 
 from config import Config
 from database import Database
+from utils.hooks import MessageHookRegistry
+from utils.prefix import PrefixMatcher
+from utils.users import UserResolver
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,8 +39,13 @@ def run_web():
 
 class SparkUtilityBot(commands.Bot):
     def __init__(self):
-        # Get prefix from environment
-        prefix = os.getenv('PREFIX', '!')
+        # Bot configuration
+        self.config = Config()
+        
+        # Prefixes are matched from precompiled tuples, both by command_prefix
+        # and by the fast reject in on_message; per-guild prefixes are loaded
+        # once in setup_hook and updated by the prefix command
+        self.prefix_matcher = PrefixMatcher([self.config.prefix])
         
         # Initialize bot with intents
         intents = discord.Intents.default()
@@ -46,29 +55,52 @@ class SparkUtilityBot(commands.Bot):
         intents.reactions = True
         
         super().__init__(
-            command_prefix=prefix,
+            command_prefix=self.prefix_matcher.command_prefix,
             intents=intents,
             help_command=None,  # We'll use custom help
             case_insensitive=True
         )
         
-        # Bot configuration
-        self.config = Config()
-        self.db = Database()
+        self.db = Database(
+            pool_size=self.config.db_pool_size,
+            write_behind=self.config.db_write_behind,
+            flush_interval=self.config.db_flush_interval_ms / 1000,
+            max_batch=self.config.db_max_batch,
+            settings_cache_size=self.config.settings_cache_size,
+            settings_cache_ttl=self.config.settings_cache_ttl,
+            shards=self.config.db_shards,
+            slow_query_ms=self.config.db_slow_query_ms
+        )
+        if self.config.db_slow_query_log:
+            handler = logging.FileHandler(self.config.db_slow_query_log)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logging.getLogger('spark.slow_queries').addHandler(handler)
         self.start_time = datetime.utcnow()
         
-        # Initialize database
-        self.db.init_db()
+        # Message-driven features subscribe here instead of being wired into on_message
+        self.message_hooks = MessageHookRegistry()
+        
+        # Shared user / DM channel lookups; use instead of fetch_user
+        self.resolver = UserResolver(self, self.config.user_cache_size, self.config.user_cache_ttl)
         
     async def setup_hook(self):
         """Load all cogs and setup the bot"""
         logger.info("🔄 Starting setup_hook...")
+        setup_start = time.perf_counter()
+        
+        # Logged in by now, so mentions of the bot can be matched as a prefix
+        self.prefix_matcher.set_user_id(self.user.id)
+        
+        # Bootstrap the database (migrations + connection pools) while cogs
+        # load; any query a cog makes early simply waits for it
+        db_task = asyncio.create_task(self.db.connect())
         
         cogs_to_load = [
             'cogs.logging_system',
             'cogs.utility', 
             'cogs.moderation',
             'cogs.tickets',
+            'cogs.maintenance',
             'cogs.help'
         ]
         
@@ -83,16 +115,34 @@ class SparkUtilityBot(commands.Bot):
                 logger.error(f"❌ Failed to load cog {cog}: {e}")
                 traceback.print_exc()
         
-        logger.info("🚀 Cog loading process completed")
+        cogs_ms = (time.perf_counter() - setup_start) * 1000
+        logger.info(f"🚀 Cog loading process completed in {cogs_ms:.0f}ms")
         logger.info(f"📋 Final loaded cogs: {list(self.cogs.keys())}")
         logger.info(f"🔧 Final available commands: {[cmd.name for cmd in self.commands]}")
         
+        db_stats = await db_task
+        logger.info(
+            f"🗄️ Database ready: schema {db_stats['schema_ms']:.0f}ms"
+            f"{' (migrated)' if db_stats['applied'] else ' (up to date)'}, "
+            f"pools {db_stats['pools_ms']:.0f}ms "
+            f"({len(self.db.backend.pools)} file(s), {self.config.db_pool_size} readers + 1 writer each), "
+            f"AFK index {db_stats['afk_index_ms']:.0f}ms ({db_stats['afk_entries']} entries)"
+        )
+        for path, versions in db_stats['applied'].items():
+            logger.info(f"🗄️ Applied migrations {versions} to {path}")
+        
+        self.prefix_matcher.load_guild_prefixes(await self.db.get_guild_prefixes())
+        logger.info(f"🔤 Loaded {len(self.prefix_matcher.guild_prefixes)} custom guild prefixes")
+        
         # Sync slash commands
+        sync_start = time.perf_counter()
         try:
             synced = await self.tree.sync()
-            logger.info(f"🔄 Synced {len(synced)} slash commands")
+            logger.info(f"🔄 Synced {len(synced)} slash commands in {(time.perf_counter() - sync_start) * 1000:.0f}ms")
         except Exception as e:
             logger.error(f"❌ Failed to sync slash commands: {e}")
+        
+        logger.info(f"⏱️ setup_hook finished in {(time.perf_counter() - setup_start) * 1000:.0f}ms")
             
     async def load_cogs_manually(self):
         """Alternative method to load cogs if setup_hook fails"""
@@ -103,6 +153,7 @@ class SparkUtilityBot(commands.Bot):
             'cogs.utility', 
             'cogs.moderation',
             'cogs.tickets',
+            'cogs.maintenance',
             'cogs.help'
         ]
         
@@ -123,7 +174,7 @@ class SparkUtilityBot(commands.Bot):
             logger.warning("⚠️ No cogs loaded in setup_hook, attempting manual load...")
             await self.load_cogs_manually()
         
-        prefix = os.getenv('PREFIX', '!')
+        prefix = self.config.prefix
         activity = discord.Activity(
             type=discord.ActivityType.watching,
             name=f"Spark Utility | {prefix}help"
@@ -136,7 +187,6 @@ class SparkUtilityBot(commands.Bot):
         # Log to owner
         try:
             owner_id = int(os.getenv('OWNER_ID'))
-            owner = await self.fetch_user(owner_id)
             
             embed = discord.Embed(
                 title="🚀 Spark Utility Bot Online",
@@ -151,7 +201,7 @@ class SparkUtilityBot(commands.Bot):
             embed.add_field(name="Commands", value=len(self.commands), inline=True)
             embed.add_field(name="Cogs", value=len(self.cogs), inline=True)
             
-            await owner.send(embed=embed)
+            await self.resolver.send_dm(owner_id, embed=embed)
             
         except Exception as e:
             logger.error(f"Could not send startup message to owner: {e}")
@@ -180,6 +230,9 @@ class SparkUtilityBot(commands.Bot):
         elif isinstance(error, commands.CommandOnCooldown):
             await ctx.send(f"⏰ Command is on cooldown. Try again in {error.retry_after:.2f} seconds.")
             
+        elif isinstance(error, commands.CheckFailure):
+            await ctx.send("❌ You don't have permission to use this command.")
+            
         else:
             logger.error(f"Unexpected error in command {ctx.command}: {error}")
             await ctx.send("❌ An unexpected error occurred. The bot owner has been notified.")
@@ -188,18 +241,22 @@ class SparkUtilityBot(commands.Bot):
         if message.author.bot:
             return
         
-        try:
-            utility_cog = self.get_cog('Utility')
-            if utility_cog:
-                await utility_cog.check_afk(message)
-        except Exception as e:
-            logger.error(f"Error in AFK system: {e}")
+        # Hooks run before commands so e.g. AFK removal happens before !afk sets it again
+        await self.message_hooks.dispatch(message)
+        
+        # Most messages are chat; skip building a Context for anything that
+        # cannot start with a prefix
+        if not self.prefix_matcher.could_be_command(message):
+            return
         
         await self.process_commands(message)
     
     async def close(self):
         logger.info("Bot is shutting down...")
+        # Cogs are unloaded before the HTTP session closes, so LoggingSystem
+        # drains its queue in cog_unload while it can still deliver
         await super().close()
+        await self.db.close()
 
 async def main():
     """Main function to run the bot and web server"""
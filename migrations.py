@@ -0,0 +1,240 @@
+import sqlite3
+import sys
+import zlib
+from typing import List, Tuple
+
+# Ordered schema migrations: (version, description, statements).
+# Never edit a released step - append a new one instead.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Base tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            log_channel_id INTEGER,
+            ticket_category_id INTEGER,
+            staff_role_ids TEXT,
+            ticket_log_channel_id INTEGER,
+            auto_archive_hours INTEGER DEFAULT 24,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            channel_id INTEGER,
+            user_id INTEGER,
+            staff_id INTEGER,
+            category TEXT,
+            status TEXT DEFAULT 'open',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            closed_at TIMESTAMP,
+            messages_count INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS afk_users (
+            user_id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            reason TEXT,
+            set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            guild_id INTEGER,
+            channel_id INTEGER,
+            message TEXT,
+            remind_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            reporter_id INTEGER,
+            reported_id INTEGER,
+            reason TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS suggestions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            suggestion TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        '''
+    ]),
+    (2, "Hot-path indexes", [
+        # get_ticket / update_ticket
+        'CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets (channel_id)',
+        # get_user_tickets
+        'CREATE INDEX IF NOT EXISTS idx_tickets_user_guild_status ON tickets (user_id, guild_id, status)',
+        # get_ticket_stats (covering: only guild_id and status are read)
+        'CREATE INDEX IF NOT EXISTS idx_tickets_guild_status ON tickets (guild_id, status)',
+        # get_due_reminders
+        'CREATE INDEX IF NOT EXISTS idx_reminders_remind_at ON reminders (remind_at)'
+    ]),
+    (3, "Key afk_users by (user_id, guild_id)", [
+        '''
+        CREATE TABLE afk_users_new (
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            reason TEXT,
+            set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, guild_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR REPLACE INTO afk_users_new (user_id, guild_id, reason, set_at)
+        SELECT user_id, guild_id, reason, set_at FROM afk_users
+        WHERE user_id IS NOT NULL AND guild_id IS NOT NULL
+        ''',
+        'DROP TABLE afk_users',
+        'ALTER TABLE afk_users_new RENAME TO afk_users'
+    ]),
+    (4, "Per-guild ticket counters", [
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_counters (
+            guild_id INTEGER PRIMARY KEY,
+            total_count INTEGER NOT NULL DEFAULT 0,
+            open_count INTEGER NOT NULL DEFAULT 0,
+            closed_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        INSERT OR REPLACE INTO ticket_counters (guild_id, total_count, open_count, closed_count)
+        SELECT guild_id, COUNT(*), SUM(status = 'open'), SUM(status = 'closed')
+        FROM tickets WHERE guild_id IS NOT NULL GROUP BY guild_id
+        '''
+    ]),
+    (5, "Per-guild retention policies", [
+        # Days before cold rows are archived; NULL uses the bot default, 0 keeps rows forever
+        '''
+        CREATE TABLE IF NOT EXISTS retention_policies (
+            guild_id INTEGER PRIMARY KEY,
+            closed_ticket_days INTEGER,
+            report_days INTEGER,
+            suggestion_days INTEGER,
+            reminder_days INTEGER,
+            afk_days INTEGER
+        )
+        '''
+    ]),
+    (6, "Per-guild AFK notice window", [
+        # Seconds repeat AFK notices are folded together; NULL uses the bot default, 0 disables
+        'ALTER TABLE guild_settings ADD COLUMN afk_notice_window INTEGER'
+    ]),
+    (7, "Per-guild command prefix", [
+        # NULL uses the global PREFIX
+        'ALTER TABLE guild_settings ADD COLUMN prefix TEXT'
+    ]),
+    (8, "Log channel webhooks", [
+        # Webhook the log channel's traffic is sent through, reused across restarts
+        'ALTER TABLE guild_settings ADD COLUMN log_webhook_id INTEGER',
+        'ALTER TABLE guild_settings ADD COLUMN log_webhook_token TEXT'
+    ]),
+    (9, "Per-guild logging policies", [
+        # 'all', 'moderation' or 'errors'; NULL logs everything
+        'ALTER TABLE guild_settings ADD COLUMN log_level TEXT',
+        # JSON object of command name -> fraction of executions logged
+        'ALTER TABLE guild_settings ADD COLUMN log_sampling TEXT',
+        # JSON list of command categories not logged
+        'ALTER TABLE guild_settings ADD COLUMN log_disabled_categories TEXT'
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _fingerprint(migrations: List[Tuple[int, str, List[str]]]) -> int:
+    """Stable 31-bit checksum of the migration list (fits PRAGMA user_version)"""
+    digest = 0
+    for version, description, statements in migrations:
+        digest = zlib.crc32(f"{version}:{description}".encode(), digest)
+        for statement in statements:
+            digest = zlib.crc32(' '.join(statement.split()).encode(), digest)
+    return digest & 0x7FFFFFFF
+
+# Stored in the file header once every migration has been applied, so a
+# database that is already current can be recognised without touching the schema
+SCHEMA_FINGERPRINT = _fingerprint(MIGRATIONS)
+
+def schema_is_current(conn: sqlite3.Connection) -> bool:
+    """Check the cached schema fingerprint in the database header"""
+    return conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_FINGERPRINT
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the highest applied migration version"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+def run_migrations(conn: sqlite3.Connection, force: bool = False) -> List[int]:
+    """Apply all pending migrations, each in its own transaction
+    
+    Returns immediately, without any DDL, when the cached schema fingerprint
+    matches unless ``force`` is set.
+    """
+    if not force and schema_is_current(conn):
+        return []
+    
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None
+    applied = []
+
+    try:
+        current = get_schema_version(conn)
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                    (version, description)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+            applied.append(version)
+        
+        conn.execute(f'PRAGMA user_version = {SCHEMA_FINGERPRINT}')
+    finally:
+        conn.isolation_level = previous_isolation
+
+    return applied
+
+if __name__ == "__main__":
+    # Usage: python migrations.py [db_path]
+    from database import QUERIES, explain_query
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "spark_utility.db"
+    conn = sqlite3.connect(db_path)
+    try:
+        applied = run_migrations(conn, force=True)
+        print(f"Schema version: {get_schema_version(conn)} (applied: {applied or 'none'})")
+        for name, sql in QUERIES.items():
+            print(f"\n{name}:")
+            for detail in explain_query(conn, sql):
+                print(f"   {detail}")
+    finally:
+        conn.close()
@@ -0,0 +1,193 @@
+import json
+from typing import Any, Iterator, Tuple
+
+def _compile_builder(cls, signature: str):
+    """Generate a function that builds a record from a row without calling __init__
+
+    The body is one tuple unpack into the slots, which is much cheaper than
+    passing every column through a Python-level ``__init__``.
+    """
+    targets = ''.join(f'self.{name}, ' for name in cls.__slots__)
+    source = f"def build({signature}):\n    self = new(cls)\n    {targets}= row\n    return self\n"
+    namespace = {'new': object.__new__, 'cls': cls}
+    exec(source, namespace)
+    build = namespace['build']
+    build.__qualname__ = f"{cls.__name__}.build"
+    return build
+
+class Record:
+    """Compact, slot-based database row with a read-only dict-style interface
+
+    Rows are built straight from the positional tuples SQLite returns, so
+    every query that feeds a record must select ``record.columns()`` in
+    order. Existing ``row['column']`` and ``row.get('column')`` call sites
+    keep working.
+    """
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+        cls.build = staticmethod(_compile_builder(cls, 'row'))
+        if 'from_row' not in cls.__dict__:
+            cls.from_row = cls.build
+            cls.row_factory = staticmethod(_compile_builder(cls, 'cursor, row'))
+
+    @classmethod
+    def columns(cls) -> str:
+        """Column list for SELECT statements, in slot order"""
+        return ', '.join(cls.__slots__)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> 'Record':
+        """Build a record from a positional row"""
+        return cls.build(row)
+
+    @classmethod
+    def row_factory(cls, cursor, row: tuple) -> 'Record':
+        """sqlite3-compatible row factory"""
+        return cls.from_row(row)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            if key in self._fields:
+                return getattr(self, key)
+        except TypeError:
+            pass
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return getattr(self, key) if key in self._fields else default
+        except TypeError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def values(self) -> list:
+        return [getattr(self, name) for name in self.__slots__]
+
+    def items(self) -> list:
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class GuildSettings(Record):
+    """Row from guild_settings"""
+
+    __slots__ = ('guild_id', 'log_channel_id', 'ticket_category_id', 'staff_role_ids',
+                 'ticket_log_channel_id', 'auto_archive_hours', 'created_at', 'afk_notice_window',
+                 'prefix', 'log_webhook_id', 'log_webhook_token', 'log_level', 'log_sampling',
+                 'log_disabled_categories')
+
+    def __init__(self, guild_id, log_channel_id, ticket_category_id, staff_role_ids,
+                 ticket_log_channel_id, auto_archive_hours, created_at, afk_notice_window,
+                 prefix, log_webhook_id, log_webhook_token, log_level, log_sampling,
+                 log_disabled_categories):
+        self.guild_id = guild_id
+        self.log_channel_id = log_channel_id
+        self.ticket_category_id = ticket_category_id
+        self.staff_role_ids = staff_role_ids
+        self.ticket_log_channel_id = ticket_log_channel_id
+        self.auto_archive_hours = auto_archive_hours
+        self.created_at = created_at
+        self.afk_notice_window = afk_notice_window
+        self.prefix = prefix
+        self.log_webhook_id = log_webhook_id
+        self.log_webhook_token = log_webhook_token
+        self.log_level = log_level
+        self.log_sampling = log_sampling
+        self.log_disabled_categories = log_disabled_categories
+
+    @classmethod
+    def from_row(cls, row: tuple) -> 'GuildSettings':
+        settings = cls.build(row)
+        # JSON columns are decoded once when the row is loaded
+        settings.staff_role_ids = json.loads(settings.staff_role_ids) if settings.staff_role_ids else []
+        settings.log_sampling = json.loads(settings.log_sampling) if settings.log_sampling else {}
+        settings.log_disabled_categories = (
+            json.loads(settings.log_disabled_categories) if settings.log_disabled_categories else []
+        )
+        return settings
+
+class Ticket(Record):
+    """Row from tickets"""
+
+    __slots__ = ('id', 'guild_id', 'channel_id', 'user_id', 'staff_id', 'category',
+                 'status', 'created_at', 'closed_at', 'messages_count')
+
+    def __init__(self, id, guild_id, channel_id, user_id, staff_id, category,
+                 status, created_at, closed_at, messages_count):
+        self.id = id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.staff_id = staff_id
+        self.category = category
+        self.status = status
+        self.created_at = created_at
+        self.closed_at = closed_at
+        self.messages_count = messages_count
+
+class AfkEntry(Record):
+    """Row from afk_users"""
+
+    __slots__ = ('user_id', 'guild_id', 'reason', 'set_at')
+
+    def __init__(self, user_id, guild_id, reason, set_at):
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.reason = reason
+        self.set_at = set_at
+
+class Reminder(Record):
+    """Row from reminders"""
+
+    __slots__ = ('id', 'user_id', 'guild_id', 'channel_id', 'message', 'remind_at', 'created_at')
+
+    def __init__(self, id, user_id, guild_id, channel_id, message, remind_at, created_at):
+        self.id = id
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message = message
+        self.remind_at = remind_at
+        self.created_at = created_at
+
+class RetentionPolicy(Record):
+    """Row from retention_policies"""
+
+    __slots__ = ('guild_id', 'closed_ticket_days', 'report_days', 'suggestion_days',
+                 'reminder_days', 'afk_days')
+
+    def __init__(self, guild_id, closed_ticket_days, report_days, suggestion_days,
+                 reminder_days, afk_days):
+        self.guild_id = guild_id
+        self.closed_ticket_days = closed_ticket_days
+        self.report_days = report_days
+        self.suggestion_days = suggestion_days
+        self.reminder_days = reminder_days
+        self.afk_days = afk_days
@@ -0,0 +1,241 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+
+from storage import ConnectionPool, shard_paths
+
+# Cold-row rules: (policy column, table, key columns, cold condition, age expression, archive?)
+# Rows matching the condition whose age is past the guild's retention period
+# are moved to <table>_archive; rules that do not archive simply delete.
+RULES: List[Tuple[str, str, Tuple[str, ...], str, str, bool]] = [
+    ('closed_ticket_days', 'tickets', ('id',), "status = 'closed'", 'COALESCE(closed_at, created_at)', True),
+    ('report_days', 'reports', ('id',), "status != 'pending'", 'created_at', True),
+    ('suggestion_days', 'suggestions', ('id',), '1', 'created_at', True),
+    # Reminders this far past due were never delivered
+    ('reminder_days', 'reminders', ('id',), '1', 'remind_at', True),
+    ('afk_days', 'afk_users', ('user_id', 'guild_id'), '1', 'set_at', False),
+]
+
+ARCHIVE_SCHEMA = 'archive'
+
+def _timestamp(moment: datetime) -> str:
+    """Format a cutoff so it compares correctly with stored timestamps"""
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+class RetentionEngine:
+    """Moves cold rows out of the hot tables and reclaims the freed pages
+
+    Each batch is its own short write transaction and the engine sleeps
+    between batches, so normal writes are never blocked for long. Archived
+    rows go to ``<table>_archive`` in the same file, or in a separate
+    archive file (one per shard) when ``archive_path`` is set.
+    """
+
+    def __init__(self, db, defaults: Dict[str, int], archive_path: Optional[str] = None,
+                 batch_size: int = 500, pause: float = 0.05, vacuum_pages: int = 500):
+        self.db = db
+        self.defaults = defaults
+        self.archive_path = archive_path
+        self.batch_size = max(1, batch_size)
+        self.pause = pause
+        self.vacuum_pages = max(1, vacuum_pages)
+        self._lock = asyncio.Lock()
+
+    def _archive_paths(self) -> List[Optional[str]]:
+        """Archive file for each pool, or None to archive inside the pool's own file"""
+        pools = self.db.backend.pools
+        if not self.archive_path:
+            return [None] * len(pools)
+        if len(pools) == 1:
+            return [self.archive_path]
+        return shard_paths(self.archive_path, len(pools))
+
+    async def run(self, convert: bool = False) -> Dict[str, Any]:
+        """Apply every retention rule to every database file and vacuum afterwards
+
+        Files without incremental auto_vacuum need a full VACUUM, which
+        blocks writes for its whole duration, before pages can be returned;
+        that only happens with ``convert``, otherwise they are left as is.
+        """
+        async with self._lock:
+            await self.db.connect()
+            start = time.perf_counter()
+            report = {
+                'moved': {table: 0 for _, table, _, _, _, archive in RULES if archive},
+                'deleted': {table: 0 for _, table, _, _, _, archive in RULES if not archive},
+                'bytes_reclaimed': 0
+            }
+
+            for pool, archive_path in zip(self.db.backend.pools, self._archive_paths()):
+                schema = await self._attach(pool, archive_path)
+                try:
+                    for rule in RULES:
+                        count = await self._apply_rule(pool, schema, rule)
+                        report['moved' if rule[5] else 'deleted'][rule[1]] += count
+                finally:
+                    if schema != 'main':
+                        await pool.maintenance(lambda db: db.execute(f'DETACH DATABASE {schema}'))
+
+                report['bytes_reclaimed'] += await self._vacuum(pool, convert)
+
+            report['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            return report
+
+    async def _attach(self, pool: ConnectionPool, archive_path: Optional[str]) -> str:
+        """Attach the archive file if there is one and make sure the archive tables exist"""
+        schema = 'main'
+        if archive_path:
+            schema = ARCHIVE_SCHEMA
+            await pool.maintenance(lambda db: db.execute(f'ATTACH DATABASE ? AS {schema}', (archive_path,)))
+
+        async def create_tables(db):
+            for _, table, _, _, _, archive in RULES:
+                if archive:
+                    await self._ensure_archive_table(db, schema, table)
+
+        try:
+            await pool.maintenance(create_tables)
+        except Exception:
+            if schema != 'main':
+                await pool.maintenance(lambda db: db.execute(f'DETACH DATABASE {schema}'))
+            raise
+        return schema
+
+    @staticmethod
+    async def _ensure_archive_table(db, schema: str, table: str):
+        """Create <table>_archive, adding any columns the hot table gained since"""
+        async with db.execute(f'PRAGMA main.table_info({table})') as cursor:
+            columns = [row[1] for row in await cursor.fetchall()]
+
+        await db.execute(
+            f'CREATE TABLE IF NOT EXISTS {schema}.{table}_archive AS '
+            f'SELECT *, NULL AS archived_at FROM main.{table} WHERE 0'
+        )
+        async with db.execute(f'PRAGMA {schema}.table_info({table}_archive)') as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        for column in columns:
+            if column not in existing:
+                await db.execute(f'ALTER TABLE {schema}.{table}_archive ADD COLUMN {column}')
+
+    async def _apply_rule(self, pool: ConnectionPool, schema: str, rule: tuple) -> int:
+        """Apply one rule to one file: guild overrides first, then the default for everyone else"""
+        field = rule[0]
+        now = datetime.utcnow()
+
+        async with pool.reader() as db:
+            async with db.execute(
+                f'SELECT guild_id, {field} FROM retention_policies WHERE {field} IS NOT NULL'
+            ) as cursor:
+                overrides = await cursor.fetchall()
+
+        total = 0
+        for guild_id, days in overrides:
+            if days > 0:
+                total += await self._move_cold_rows(
+                    pool, schema, rule, 'guild_id = ?', (guild_id,), _timestamp(now - timedelta(days=days))
+                )
+
+        default_days = self.defaults.get(field, 0)
+        if default_days > 0:
+            total += await self._move_cold_rows(
+                pool, schema, rule,
+                f'(guild_id IS NULL OR guild_id NOT IN '
+                f'(SELECT guild_id FROM retention_policies WHERE {field} IS NOT NULL))',
+                (), _timestamp(now - timedelta(days=default_days))
+            )
+        return total
+
+    async def _move_cold_rows(self, pool: ConnectionPool, schema: str, rule: tuple,
+                              scope: str, scope_params: tuple, cutoff: str) -> int:
+        """Archive or delete matching rows in small batches, walking the key in order"""
+        _, table, keys, condition, age, archive = rule
+        key_list = ', '.join(keys)
+        key_match = ' AND '.join(f'{key} = ?' for key in keys)
+        archived_at = _timestamp(datetime.utcnow())
+        select_sql = (
+            f'SELECT {key_list} FROM {table} '
+            f'WHERE ({key_list}) > ({", ".join("?" * len(keys))}) AND {condition} AND {age} < ? AND {scope} '
+            f'ORDER BY {key_list} LIMIT ?'
+        )
+
+        async def op(db, after):
+            async with db.execute(select_sql, (*after, cutoff, *scope_params, self.batch_size)) as cursor:
+                rows = await cursor.fetchall()
+            if not rows:
+                return []
+
+            if archive:
+                async with db.execute(f'PRAGMA main.table_info({table})') as cursor:
+                    columns = ', '.join(row[1] for row in await cursor.fetchall())
+                await db.executemany(
+                    f'INSERT INTO {schema}.{table}_archive ({columns}, archived_at) '
+                    f'SELECT {columns}, ? FROM main.{table} WHERE {key_match}',
+                    [(archived_at, *row) for row in rows]
+                )
+
+            if table == 'tickets':
+                # Keep ticket_counters in step with the hot table
+                async with db.execute(
+                    f'SELECT guild_id, COUNT(*) FROM tickets WHERE id IN ({", ".join("?" * len(rows))}) '
+                    'GROUP BY guild_id',
+                    [row[0] for row in rows]
+                ) as cursor:
+                    per_guild = await cursor.fetchall()
+                await db.executemany(
+                    'UPDATE ticket_counters SET total_count = total_count - ?, closed_count = closed_count - ? '
+                    'WHERE guild_id = ?',
+                    [(count, count, guild_id) for guild_id, count in per_guild]
+                )
+
+            await db.executemany(f'DELETE FROM main.{table} WHERE {key_match}', rows)
+            return rows
+
+        total = 0
+        after = (-2 ** 63,) * len(keys)
+        while True:
+            rows = await pool.write(lambda db, after=after: op(db, after))
+            if table == 'afk_users':
+                for user_id, guild_id in rows:
+                    self.db.afk_index.pop((user_id, guild_id), None)
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                return total
+            after = tuple(rows[-1])
+            # Let queued bot writes run between batches
+            await asyncio.sleep(self.pause)
+
+    async def _vacuum(self, pool: ConnectionPool, convert: bool = False) -> int:
+        """Return free pages to the filesystem, returning the bytes reclaimed"""
+        async def pragma(db, name):
+            async with db.execute(f'PRAGMA {name}') as cursor:
+                return (await cursor.fetchone())[0]
+
+        page_size = await pool.maintenance(lambda db: pragma(db, 'page_size'))
+        before = await pool.maintenance(lambda db: pragma(db, 'page_count'))
+        mode = await pool.maintenance(lambda db: pragma(db, 'auto_vacuum'))
+
+        if mode == 0 and convert:
+            # Files created before incremental auto_vacuum need one full VACUUM to switch
+            async def switch_to_incremental(db):
+                await db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                await db.execute('VACUUM')
+            await pool.maintenance(switch_to_incremental)
+        elif mode == 2:
+            async def step(db):
+                async with db.execute(f'PRAGMA incremental_vacuum({self.vacuum_pages})') as cursor:
+                    await cursor.fetchall()
+                return await pragma(db, 'freelist_count')
+
+            # A few hundred pages at a time, releasing the writer in between
+            free = await pool.maintenance(lambda db: pragma(db, 'freelist_count'))
+            while free:
+                remaining = await pool.maintenance(step)
+                if remaining >= free:
+                    break
+                free = remaining
+                await asyncio.sleep(self.pause)
+
+        await pool.maintenance(lambda db: db.execute('PRAGMA wal_checkpoint(TRUNCATE)'))
+        after = await pool.maintenance(lambda db: pragma(db, 'page_count'))
+        return max(0, before - after) * page_size
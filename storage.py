@@ -0,0 +1,453 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable
+import aiosqlite
+
+from instrumentation import add_lock_wait, lock_wait
+from migrations import run_migrations
+
+# A write operation receives the writer connection inside an open transaction
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+class ConnectionPool:
+    """Persistent aiosqlite connections: one writer plus a set of WAL readers"""
+    
+    def __init__(self, db_path: str, readers: int = 4, write_behind: bool = False,
+                 flush_interval: float = 0.005, max_batch: int = 100):
+        self.db_path = db_path
+        self.size = max(1, readers)
+        self.is_open = False
+        self._writer = None
+        self._writer_lock = asyncio.Lock()
+        self._readers = asyncio.Queue()
+        self._connections = []
+        
+        # Write-behind (group commit) settings
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self._write_queue = asyncio.Queue()
+        self._batch_full = asyncio.Event()
+        self._drain_task = None
+        
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'in_use': 0,
+            'max_in_use': 0,
+            'writer_checkouts': 0,
+            'writer_waits': 0,
+            'writes': 0,
+            'commits': 0,
+            'failed_writes': 0
+        }
+    
+    async def _connect(self, **kwargs) -> aiosqlite.Connection:
+        """Open a single connection with the pool's pragmas applied"""
+        conn = await aiosqlite.connect(self.db_path, **kwargs)
+        await conn.execute('PRAGMA journal_mode=WAL')
+        await conn.execute('PRAGMA synchronous=NORMAL')
+        await conn.execute('PRAGMA busy_timeout=5000')
+        self._connections.append(conn)
+        return conn
+    
+    async def open(self):
+        """Open the writer and all reader connections"""
+        if self.is_open:
+            return
+        
+        # The writer manages its own transactions (see _run_batch)
+        self._writer = await self._connect(isolation_level=None)
+        for _ in range(self.size):
+            self._readers.put_nowait(await self._connect())
+        self.is_open = True
+        
+        if self.write_behind:
+            self._drain_task = asyncio.create_task(self._drain_writes())
+    
+    async def close(self):
+        """Flush pending writes and close every connection owned by the pool"""
+        if self._drain_task:
+            # The sentinel is queued behind every pending write, so the
+            # drain task commits everything before it exits
+            self._write_queue.put_nowait(None)
+            self._batch_full.set()
+            try:
+                await self._drain_task
+            except Exception as e:
+                print(f"Error flushing pending writes: {e}")
+            self._drain_task = None
+        
+        self.is_open = False
+        for conn in self._connections:
+            try:
+                await conn.close()
+            except Exception as e:
+                print(f"Error closing database connection: {e}")
+        self._connections.clear()
+        self._writer = None
+        self._readers = asyncio.Queue()
+    
+    @asynccontextmanager
+    async def reader(self):
+        """Check out a reader connection"""
+        self.stats['checkouts'] += 1
+        if self._readers.empty():
+            self.stats['waits'] += 1
+            start = time.perf_counter()
+            conn = await self._readers.get()
+            add_lock_wait(time.perf_counter() - start)
+        else:
+            conn = self._readers.get_nowait()
+        self.stats['in_use'] += 1
+        self.stats['max_in_use'] = max(self.stats['max_in_use'], self.stats['in_use'])
+        try:
+            yield conn
+        finally:
+            self.stats['in_use'] -= 1
+            self._readers.put_nowait(conn)
+    
+    @asynccontextmanager
+    async def writer(self):
+        """Check out the single writer connection"""
+        self.stats['writer_checkouts'] += 1
+        if self._writer_lock.locked():
+            self.stats['writer_waits'] += 1
+        async with self._writer_lock:
+            yield self._writer
+    
+    async def write(self, op: WriteOp, wait: bool = True) -> Any:
+        """Run a write operation in its own savepoint and return its result
+        
+        With write-behind enabled the operation is queued and committed with
+        other pending writes. ``wait=False`` returns immediately in that mode,
+        so the write may not yet be visible to a following read and a failure
+        is only logged; otherwise the caller gets the result (or exception)
+        once the batch has committed.
+        """
+        future = asyncio.get_running_loop().create_future() if wait else None
+        
+        waits = lock_wait.get()
+        if waits is not None and wait:
+            # Charge the time spent queued / waiting for the writer to the caller
+            queued_at = time.perf_counter()
+            inner = op
+            
+            async def op(db):
+                waits[0] += time.perf_counter() - queued_at
+                return await inner(db)
+        
+        if not self.write_behind:
+            await self._run_batch([(op, future)])
+            return future.result() if future else None
+        
+        self._write_queue.put_nowait((op, future))
+        if self._write_queue.qsize() >= self.max_batch:
+            self._batch_full.set()
+        
+        if future:
+            return await future
+        return None
+    
+    async def maintenance(self, op: WriteOp) -> Any:
+        """Run an operation on the writer outside any transaction
+        
+        For statements that cannot run inside one (VACUUM, ATTACH, some
+        pragmas). Queued write-behind batches are committed first.
+        """
+        await self.flush()
+        async with self.writer() as db:
+            return await op(db)
+    
+    async def flush(self):
+        """Wait until every write queued so far has been committed"""
+        if self.write_behind and self._drain_task:
+            async def noop(db):
+                return None
+            await self.write(noop)
+    
+    async def _drain_writes(self):
+        """Background task committing queued writes in groups"""
+        while True:
+            first = await self._write_queue.get()
+            batch = [] if first is None else [first]
+            stop = first is None
+            
+            if not stop:
+                # Give other writers a moment to join this transaction
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._batch_full.clear()
+                
+                while len(batch) < self.max_batch and not self._write_queue.empty():
+                    item = self._write_queue.get_nowait()
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+            
+            if batch:
+                await self._run_batch(batch)
+            
+            if stop:
+                # Commit anything that was queued behind the sentinel
+                while not self._write_queue.empty():
+                    item = self._write_queue.get_nowait()
+                    if item is not None:
+                        await self._run_batch([item])
+                return
+    
+    async def _run_batch(self, batch: List):
+        """Run a group of write operations in a single transaction"""
+        results = []
+        async with self.writer() as db:
+            try:
+                await db.execute('BEGIN IMMEDIATE')
+                for op, _ in batch:
+                    # A savepoint per operation keeps one failure from
+                    # discarding the rest of the group
+                    await db.execute('SAVEPOINT write_op')
+                    try:
+                        result = await op(db)
+                        await db.execute('RELEASE write_op')
+                        results.append((True, result))
+                    except Exception as e:
+                        await db.execute('ROLLBACK TO write_op')
+                        await db.execute('RELEASE write_op')
+                        results.append((False, e))
+                await db.execute('COMMIT')
+                self.stats['commits'] += 1
+            except Exception as e:
+                if db.in_transaction:
+                    await db.execute('ROLLBACK')
+                results = [(False, e)] * len(batch)
+            except BaseException:
+                # Cancelled part-way: never leave the writer inside BEGIN
+                if db.in_transaction:
+                    await db.execute('ROLLBACK')
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.cancel()
+                raise
+        
+        self.stats['writes'] += len(batch)
+        for (_, future), (ok, value) in zip(batch, results):
+            if not ok:
+                self.stats['failed_writes'] += 1
+            if future is None:
+                if not ok:
+                    print(f"Error in queued database write: {value}")
+            elif not future.done():
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+    
+    def get_stats(self) -> Dict:
+        """Get a snapshot of pool usage"""
+        return {
+            'size': self.size,
+            'available': self._readers.qsize(),
+            'queued_writes': self._write_queue.qsize(),
+            **self.stats
+        }
+
+class StorageBackend:
+    """Where Database keeps its data: maps guild ids onto connection pools"""
+    
+    def __init__(self, paths: List[str], **pool_options):
+        self.paths = list(paths)
+        self.pools = [ConnectionPool(path, **pool_options) for path in self.paths]
+    
+    @property
+    def is_open(self) -> bool:
+        return all(pool.is_open for pool in self.pools)
+    
+    def pool_for(self, guild_id: Optional[int]) -> ConnectionPool:
+        """Pool holding the given guild's rows"""
+        raise NotImplementedError
+    
+    def init_schema(self) -> Dict[str, List[int]]:
+        """Apply pending migrations to every file, returning the versions applied per file"""
+        return {path: _migrate_file(path) for path in self.paths}
+    
+    async def init_schema_async(self) -> Dict[str, List[int]]:
+        """init_schema without blocking the event loop; files are migrated in parallel threads"""
+        applied = await asyncio.gather(*(asyncio.to_thread(_migrate_file, path) for path in self.paths))
+        return dict(zip(self.paths, applied))
+    
+    async def open(self):
+        await asyncio.gather(*(pool.open() for pool in self.pools))
+    
+    async def close(self):
+        await asyncio.gather(*(pool.close() for pool in self.pools))
+    
+    async def flush(self):
+        await asyncio.gather(*(pool.flush() for pool in self.pools))
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        """Pool statistics keyed by database file"""
+        return {pool.db_path: pool.get_stats() for pool in self.pools}
+
+class SingleFileBackend(StorageBackend):
+    """Every guild in one SQLite file"""
+    
+    def __init__(self, db_path: str, **pool_options):
+        super().__init__([db_path], **pool_options)
+    
+    def pool_for(self, guild_id: Optional[int]) -> ConnectionPool:
+        return self.pools[0]
+
+class ShardedBackend(StorageBackend):
+    """Guilds spread over several SQLite files by a stable hash of the guild id
+    
+    Each shard has its own writer, so writes for guilds on different shards
+    never wait on each other.
+    """
+    
+    def __init__(self, db_path: str, shards: int, **pool_options):
+        self.shard_count = max(1, shards)
+        super().__init__(shard_paths(db_path, self.shard_count), **pool_options)
+    
+    def shard_for(self, guild_id: Optional[int]) -> int:
+        """Shard index for a guild (DM rows with no guild live on the same shard as guild 0)"""
+        return zlib.crc32((guild_id or 0).to_bytes(8, 'little', signed=True)) % self.shard_count
+    
+    def pool_for(self, guild_id: Optional[int]) -> ConnectionPool:
+        return self.pools[self.shard_for(guild_id)]
+
+def _migrate_file(path: str) -> List[int]:
+    """Apply pending migrations to one database file"""
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute('PRAGMA page_count').fetchone()[0] == 0:
+            # auto_vacuum can only be chosen cheaply before the first table exists
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        return run_migrations(conn)
+    finally:
+        conn.close()
+
+def shard_paths(db_path: str, shards: int) -> List[str]:
+    """File names used for a sharded layout, e.g. spark_utility.shard0.db"""
+    stem, ext = os.path.splitext(db_path)
+    return [f"{stem}.shard{i}{ext or '.db'}" for i in range(shards)]
+
+def create_backend(db_path: str, shards: int = 1, **pool_options) -> StorageBackend:
+    """Single-file backend for one shard, sharded backend otherwise"""
+    if shards > 1:
+        return ShardedBackend(db_path, shards, **pool_options)
+    return SingleFileBackend(db_path, **pool_options)
+
+# Tables whose rows belong to a guild, in copy order
+GUILD_TABLES = ['guild_settings', 'tickets', 'afk_users', 'reminders', 'reports', 'suggestions',
+                'retention_policies']
+
+def migrate_layout(source_paths: Iterable[str], target: StorageBackend, batch_size: int = 1000) -> Dict[str, int]:
+    """Copy every guild row from existing database files into a backend's layout
+    
+    Works for single file -> shards and for re-sharding (old shards -> new
+    shards). Run it with the bot stopped. Targets are migrated to the latest
+    schema first and their ticket counters are rebuilt afterwards. Row ids are
+    preserved unless they collide with a row already copied from another
+    source file.
+    """
+    source_paths = [os.path.abspath(path) for path in source_paths]
+    if set(source_paths) & {os.path.abspath(path) for path in target.paths}:
+        raise ValueError("Target files must differ from the source files")
+    
+    target.init_schema()
+    targets = [sqlite3.connect(path) for path in target.paths]
+    shard_of = target.pool_for
+    index_of = {pool.db_path: i for i, pool in enumerate(target.pools)}
+    copied = {table: 0 for table in GUILD_TABLES}
+    
+    try:
+        for source_path in source_paths:
+            source = sqlite3.connect(source_path)
+            try:
+                run_migrations(source)
+                for table in GUILD_TABLES:
+                    cursor = source.execute(f'SELECT * FROM {table}')
+                    columns = [description[0] for description in cursor.description]
+                    guild_index = columns.index('guild_id')
+                    
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        
+                        grouped = {}
+                        for row in rows:
+                            grouped.setdefault(index_of[shard_of(row[guild_index]).db_path], []).append(row)
+                        
+                        for shard, shard_rows in grouped.items():
+                            _copy_rows(targets[shard], table, columns, shard_rows)
+                        copied[table] += len(rows)
+            finally:
+                source.close()
+        
+        # database imports this module, so QUERIES is only imported once it is needed
+        from database import QUERIES
+        
+        for conn in targets:
+            conn.execute('DELETE FROM ticket_counters')
+            conn.execute(
+                'INSERT INTO ticket_counters (guild_id, total_count, open_count, closed_count) '
+                + QUERIES['count_tickets']
+            )
+            conn.commit()
+    finally:
+        for conn in targets:
+            conn.close()
+    
+    return copied
+
+def _copy_rows(conn: sqlite3.Connection, table: str, columns: List[str], rows: List[tuple]):
+    """Insert rows into a target file, dropping ids that are already taken"""
+    placeholders = ', '.join('?' * len(columns))
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+                if table in ('guild_settings', 'afk_users', 'retention_policies') else
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                rows
+            )
+    except sqlite3.IntegrityError:
+        # An id from another source file already exists here; keep the ids
+        # that are free and let SQLite assign fresh ids to the colliding rows
+        id_index = columns.index('id')
+        kept = [column for column in columns if column != 'id']
+        colliding = []
+        with conn:
+            for row in rows:
+                try:
+                    conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", row)
+                except sqlite3.IntegrityError:
+                    colliding.append(row[:id_index] + row[id_index + 1:])
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(kept)}) VALUES ({', '.join('?' * len(kept))})",
+                colliding
+            )
+
+if __name__ == "__main__":
+    # Usage: python storage.py --source spark_utility.db --target spark_utility.db --shards 4
+    parser = argparse.ArgumentParser(description="Move guild data between storage layouts")
+    parser.add_argument('--source', nargs='+', required=True, help="Existing database file(s)")
+    parser.add_argument('--target', default="spark_utility.db", help="Base path of the new layout")
+    parser.add_argument('--shards', type=int, default=4, help="Number of shards in the new layout")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    
+    backend = create_backend(args.target, args.shards)
+    counts = migrate_layout(args.source, backend, args.batch_size)
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+    print(f"Wrote {', '.join(backend.paths)}")
@@ -0,0 +1,66 @@
+"""
+Tests that the cogs load as extensions and register their commands
+"""
+
+import asyncio
+
+import discord
+from discord.ext import commands
+
+from database import Database
+from utils.hooks import MessageHookRegistry
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def make_bot(tmp_path):
+    """A bot that is never logged in, with the attributes the cogs expect"""
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.default())
+    bot.db = Database(str(tmp_path / 'bot.db'))
+    bot.message_hooks = MessageHookRegistry()
+    return bot
+
+def test_utility_registers_prefix(tmp_path):
+    async def scenario():
+        bot = await make_bot(tmp_path)
+        try:
+            await bot.load_extension('cogs.utility')
+            command = bot.get_command('prefix')
+            assert command is not None
+            assert command.cog is bot.get_cog('Utility')
+        finally:
+            await bot.close()
+            await bot.db.close()
+
+    run(scenario())
+
+def test_utility_registers_afknotice(tmp_path):
+    async def scenario():
+        bot = await make_bot(tmp_path)
+        try:
+            await bot.load_extension('cogs.utility')
+            assert bot.get_command('afknotice').cog is bot.get_cog('Utility')
+
+            # The per-guild window the command stores is what AFK checks use
+            await bot.db.set_guild_setting(1, 'afk_notice_window', 45)
+            assert await bot.get_cog('Utility').get_afk_notice_window(1) == 45
+        finally:
+            await bot.close()
+            await bot.db.close()
+
+    run(scenario())
+
+def test_afk_hook_follows_the_cog(tmp_path):
+    async def scenario():
+        bot = await make_bot(tmp_path)
+        try:
+            assert 'afk' not in bot.message_hooks.get_stats()
+            await bot.load_extension('cogs.utility')
+            assert 'afk' in bot.message_hooks.get_stats()
+            await bot.unload_extension('cogs.utility')
+            assert 'afk' not in bot.message_hooks.get_stats()
+        finally:
+            await bot.close()
+            await bot.db.close()
+
+    run(scenario())
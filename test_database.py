@@ -0,0 +1,266 @@
+"""
+Tests for the database layer: write-behind, storage backends, ticket counters, retention and export/import
+"""
+
+import asyncio
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from backup import export_table, import_table
+from database import QUERIES, Database, _ticket_update_columns, _ticket_update_sql
+from retention import RetentionEngine
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def open_database(path, shards=1, **options):
+    db = Database(str(path), shards=shards, **options)
+    await db.connect()
+    return db
+
+async def seed_tickets(db, guilds=(1, 2, 3, 4), per_guild=5):
+    """Create tickets in several guilds, closing every other one"""
+    channel_id = 1000
+    channels = []
+    for guild_id in guilds:
+        for i in range(per_guild):
+            channel_id += 1
+            await db.create_ticket(guild_id, channel_id, 500 + i, 'support')
+            if i % 2:
+                await db.update_ticket(channel_id, status='closed')
+            channels.append(channel_id)
+    return channels
+
+@pytest.mark.parametrize('shards', [1, 3])
+def test_ticket_counters_stay_in_step(tmp_path, shards):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db', shards)
+        try:
+            channels = await seed_tickets(db)
+            assert await db.get_ticket_stats(1) == {'total': 5, 'open': 3, 'closed': 2}
+
+            assert await db.update_tickets(channels[:4], status='closed') == 4
+            assert await db.close_guild_tickets(2) == 3
+            assert await db.verify_ticket_counters() == {}
+            assert await db.get_ticket_stats(1) == {'total': 5, 'open': 1, 'closed': 4}
+            assert await db.get_ticket_stats(2) == {'total': 5, 'open': 0, 'closed': 5}
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_sharded_backend_spreads_guilds(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db', 3)
+        try:
+            assert db.sharded
+            await seed_tickets(db, guilds=range(1, 31), per_guild=1)
+            ticket = await db.get_ticket(1001)
+            assert ticket.guild_id == 1 and ticket.status == 'open'
+            used = {db.backend.pools.index(db._pool(guild_id)) for guild_id in range(1, 31)}
+            assert len(used) > 1
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_update_rejects_unknown_columns(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db')
+        try:
+            channels = await seed_tickets(db, guilds=(1,), per_guild=1)
+            with pytest.raises(ValueError):
+                await db.update_ticket(channels[0], guild_id=2)
+            with pytest.raises(ValueError):
+                await db.update_tickets(channels, **{'status = status; --': 'x'})
+            with pytest.raises(ValueError):
+                await db.update_tickets(channels)
+            assert (await db.get_ticket(channels[0])).guild_id == 1
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_closed_database_is_not_reopened(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db')
+        await db.close()
+        with pytest.raises(RuntimeError):
+            await db.get_ticket(1)
+
+    run(scenario())
+
+def test_retention_archives_cold_tickets(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db')
+        try:
+            channels = await seed_tickets(db, guilds=(1, 2))
+            old = datetime.utcnow() - timedelta(days=30)
+            await db.update_tickets(channels[:3], status='closed', closed_at=old.strftime('%Y-%m-%d %H:%M:%S'))
+            await db.set_retention_policy(2, 'closed_ticket_days', 0)
+
+            engine = RetentionEngine(db, {'closed_ticket_days': 7}, batch_size=2, pause=0)
+            report = await engine.run()
+
+            # Guild 1's old closed tickets are archived; guild 2 keeps everything
+            assert report['moved']['tickets'] == 3
+            assert await db.get_ticket(channels[0]) is None
+            assert (await db.get_ticket(channels[4])).status == 'open'
+            assert await db.get_ticket_stats(1) == {'total': 2, 'open': 1, 'closed': 1}
+            assert await db.get_ticket_stats(2) == {'total': 5, 'open': 3, 'closed': 2}
+            assert await db.verify_ticket_counters() == {}
+
+            async with db._reader(db.backend.pools[0]) as conn:
+                async with conn.execute('SELECT COUNT(*) FROM tickets_archive') as cursor:
+                    assert (await cursor.fetchone())[0] == 3
+
+            assert (await engine.run())['moved']['tickets'] == 0
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_export_import_round_trip(tmp_path):
+    async def scenario():
+        source = await open_database(tmp_path / 'source.db')
+        try:
+            await seed_tickets(source)
+        finally:
+            await source.close()
+        # The target only needs the schema
+        target = await open_database(tmp_path / 'target.db')
+        await target.close()
+
+    run(scenario())
+
+    dump = io.StringIO()
+    assert export_table(str(tmp_path / 'source.db'), 'tickets', dump, batch_size=3) == 20
+    dump.seek(0)
+    assert import_table(str(tmp_path / 'target.db'), 'tickets', dump, batch_size=3) == 20
+
+    async def check():
+        target = await open_database(tmp_path / 'target.db')
+        try:
+            ticket = await target.get_ticket(1002)
+            assert ticket.guild_id == 1 and ticket.status == 'closed'
+            assert await target.get_ticket_stats(3) == {'total': 5, 'open': 3, 'closed': 2}
+            assert await target.verify_ticket_counters() == {}
+        finally:
+            await target.close()
+
+    run(check())
+
+def test_cancelled_write_is_rolled_back(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db')
+        try:
+            async def slow(conn):
+                await conn.execute(
+                    "INSERT INTO reports (guild_id, reporter_id, reported_id, reason) VALUES (1, 1, 1, 'lost')"
+                )
+                await asyncio.sleep(10)
+
+            task = asyncio.create_task(db.backend.pools[0].write(slow))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            # The writer is usable again and the cancelled insert is gone
+            assert await asyncio.wait_for(db.add_report(1, 2, 3, 'kept'), 5) == 1
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_write_behind_group_commits(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db', write_behind=True, flush_interval=0.05)
+        try:
+            ids = await asyncio.gather(*(db.add_report(1, i, i, 'spam') for i in range(50)))
+            # Every caller gets its own row id back through its future
+            assert sorted(ids) == list(range(1, 51))
+            stats = db.backend.pools[0].stats
+            assert stats['writes'] >= 50
+            assert stats['commits'] < 10
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_write_behind_isolates_failed_ops(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db', write_behind=True, flush_interval=0.05)
+        try:
+            async def broken(conn):
+                await conn.execute(
+                    "INSERT INTO reports (guild_id, reporter_id, reported_id, reason) VALUES (1, 1, 1, 'undone')"
+                )
+                await conn.execute('INSERT INTO no_such_table VALUES (1)')
+
+            results = await asyncio.gather(
+                db.add_report(1, 1, 1, 'first'),
+                db.backend.pools[0].write(broken),
+                db.add_report(1, 2, 2, 'second'),
+                return_exceptions=True
+            )
+            assert isinstance(results[1], Exception)
+            assert db.backend.pools[0].stats['failed_writes'] == 1
+
+            # The savepoint undid only the failed op; its neighbours committed
+            async with db._reader(db.backend.pools[0]) as conn:
+                async with conn.execute('SELECT reason FROM reports ORDER BY id') as cursor:
+                    assert [row[0] for row in await cursor.fetchall()] == ['first', 'second']
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_write_behind_flushes_on_close(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db', write_behind=True, flush_interval=1.0)
+        for user_id in range(20):
+            # Fire-and-forget in write-behind mode: queued, not yet committed
+            await db.set_afk(user_id, 1, 'away')
+        assert db.backend.pools[0].stats['commits'] == 0
+        await db.close()
+
+        db = await open_database(tmp_path / 'bot.db')
+        try:
+            assert len(db.afk_index) == 20
+            assert (await db.get_afk(7, 1)).reason == 'away'
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_failed_afk_write_keeps_index_in_step(tmp_path):
+    async def scenario():
+        db = await open_database(tmp_path / 'bot.db')
+        try:
+            await db.set_afk(1, 1, 'lunch')
+            pool = db._pool(1)
+            async with pool.writer() as conn:
+                await conn.execute('DROP TABLE afk_users')
+
+            with pytest.raises(Exception):
+                await db.set_afk(1, 1, 'dinner')
+            assert (await db.get_afk(1, 1)).reason == 'lunch'
+
+            with pytest.raises(Exception):
+                await db.set_afk(2, 1, 'away')
+            assert await db.get_afk(2, 1) is None
+
+            with pytest.raises(Exception):
+                await db.remove_afk(1, 1)
+            assert (await db.get_afk(1, 1)).reason == 'lunch'
+        finally:
+            await db.close()
+
+    run(scenario())
+
+def test_registered_update_is_the_statement_run():
+    columns, _ = _ticket_update_columns({'status': 'closed', 'closed_at': '2024-01-01 00:00:00'})
+    assert QUERIES['update_ticket'] == _ticket_update_sql(columns)
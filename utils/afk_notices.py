@@ -0,0 +1,83 @@
+import asyncio
+import time
+import discord
+from typing import Dict, List, Tuple
+from utils.embeds import afk_mentions_embed
+
+class AfkNotice:
+    """One AFK notice message and the AFK users it lists"""
+
+    __slots__ = ('message', 'users', 'counts', 'expires_at', 'edit_task')
+
+    def __init__(self, message: discord.Message, users: List[tuple], expires_at: float):
+        self.message = message
+        self.users = users
+        self.counts = {user.id: 1 for user, _ in users}
+        self.expires_at = expires_at
+        self.edit_task = None
+
+class AfkNoticeCoalescer:
+    """Suppresses repeat "User is AFK" notices per channel
+
+    The first mention of an AFK user in a channel sends a notice. Further
+    mentions of that user in the same channel within the window are not
+    sent again; they bump a counter on the existing notice, which is
+    edited at most once per ``edit_delay`` seconds.
+    """
+
+    def __init__(self, edit_delay: float = 2.0):
+        self.edit_delay = edit_delay
+        self._notices: Dict[Tuple[int, int], AfkNotice] = {}
+        self._next_prune = 0.0
+        self.stats = {'sent': 0, 'suppressed': 0, 'edits': 0}
+
+    async def notify(self, channel: discord.abc.Messageable, afk_mentions: List[tuple], window: float):
+        """Send or fold a notice for (member, afk entry) pairs mentioned in a channel"""
+        now = time.monotonic()
+        self._prune(now)
+
+        fresh = []
+        for user, entry in afk_mentions:
+            notice = self._notices.get((channel.id, user.id))
+            if notice is not None and notice.expires_at > now:
+                notice.counts[user.id] += 1
+                self.stats['suppressed'] += 1
+                self._schedule_edit(notice)
+            else:
+                fresh.append((user, entry))
+
+        if not fresh:
+            return
+
+        message = await channel.send(embed=afk_mentions_embed(fresh), delete_after=window)
+        self.stats['sent'] += 1
+        notice = AfkNotice(message, fresh, now + window)
+        for user, _ in fresh:
+            self._notices[(channel.id, user.id)] = notice
+
+    def _schedule_edit(self, notice: AfkNotice):
+        """Fold suppressed mentions into the notice with one delayed edit"""
+        if notice.edit_task is None or notice.edit_task.done():
+            notice.edit_task = asyncio.create_task(self._edit_later(notice))
+
+    async def _edit_later(self, notice: AfkNotice):
+        await asyncio.sleep(self.edit_delay)
+        if notice.expires_at <= time.monotonic():
+            return
+        try:
+            await notice.message.edit(embed=afk_mentions_embed(notice.users, notice.counts))
+            self.stats['edits'] += 1
+        except discord.NotFound:
+            # Deleted early; the next mention sends a new notice
+            notice.expires_at = 0
+        except Exception as e:
+            print(f"Error updating AFK notice: {e}")
+
+    def _prune(self, now: float):
+        """Forget expired notices (at most once a second)"""
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 1.0
+        expired = [key for key, notice in self._notices.items() if notice.expires_at <= now]
+        for key in expired:
+            del self._notices[key]
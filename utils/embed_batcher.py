@@ -0,0 +1,92 @@
+import asyncio
+import discord
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+# Discord limits for a single message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+class _Batch:
+    """Embeds waiting to be sent to one destination"""
+
+    __slots__ = ('embeds', 'chars', 'timer', 'lock')
+
+    def __init__(self):
+        self.embeds: List[discord.Embed] = []
+        self.chars = 0
+        self.timer = None
+        self.lock = asyncio.Lock()
+
+class EmbedBatcher:
+    """Packs embeds bound for the same destination into multi-embed messages
+
+    A destination's batch is sent when it holds ``MAX_EMBEDS`` embeds, when
+    the next embed would push it past ``MAX_EMBED_CHARS``, or ``interval``
+    seconds after its first embed was added, whichever comes first.
+    """
+
+    def __init__(self, send: Callable[[Hashable, List[discord.Embed]], Awaitable[Any]], interval: float = 2.0):
+        self.send = send
+        self.interval = interval
+        self._batches: Dict[Hashable, _Batch] = {}
+        self.stats = {'embeds': 0, 'messages': 0, 'failed': 0}
+
+    async def add(self, destination: Hashable, embed: discord.Embed):
+        """Queue an embed for a destination, sending the batch if it is full"""
+        batch = self._batches.get(destination)
+        if batch is None:
+            batch = self._batches[destination] = _Batch()
+
+        size = len(embed)
+        if batch.embeds and batch.chars + size > MAX_EMBED_CHARS:
+            await self.flush(destination)
+
+        batch.embeds.append(embed)
+        batch.chars += size
+
+        if len(batch.embeds) >= MAX_EMBEDS or self.interval <= 0:
+            await self.flush(destination)
+        elif batch.timer is None:
+            batch.timer = asyncio.create_task(self._flush_later(destination))
+
+    async def _flush_later(self, destination: Hashable):
+        await asyncio.sleep(self.interval)
+        batch = self._batches.get(destination)
+        if batch is not None:
+            batch.timer = None
+        await self.flush(destination)
+
+    async def flush(self, destination: Hashable):
+        """Send whatever is pending for a destination"""
+        batch = self._batches.get(destination)
+        if batch is None or not batch.embeds:
+            return
+
+        embeds, batch.embeds, batch.chars = batch.embeds, [], 0
+        if batch.timer is not None and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+        batch.timer = None
+
+        # One send at a time per destination keeps messages in order
+        async with batch.lock:
+            try:
+                await self.send(destination, embeds)
+                self.stats['messages'] += 1
+                self.stats['embeds'] += len(embeds)
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"Error sending log batch to {destination}: {e}")
+
+    async def flush_all(self):
+        """Send every pending batch (used on shutdown)"""
+        for destination in list(self._batches):
+            await self.flush(destination)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(batch.embeds) for batch in self._batches.values())
+
+    @property
+    def calls_saved(self) -> int:
+        """Messages avoided by sending several embeds in one"""
+        return self.stats['embeds'] - self.stats['messages']
@@ -345,6 +345,33 @@ def afk_embed(user: discord.Member, reason: str, action: str = "set") -> discord
     
     return embed.build()
 
+def afk_mentions_embed(afk_users: List[tuple], mention_counts: Dict[int, int] = None) -> discord.Embed:
+    """Create one embed listing every mentioned AFK user, from (member, afk entry) pairs"""
+    mention_counts = mention_counts or {}
+    
+    if len(afk_users) == 1:
+        user, entry = afk_users[0]
+        embed = EmbedBuilder().title("💤 User is AFK").description(f"{user.mention} is currently AFK").color(discord.Color.yellow())
+        embed.field("Reason", entry['reason'][:1024], False)
+        embed.field("Since", f"<t:{int(datetime.fromisoformat(entry['set_at']).timestamp())}:R>", False)
+        if mention_counts.get(user.id, 1) > 1:
+            embed.field("Mentions", f"Mentioned {mention_counts[user.id]} times", False)
+        return embed.build()
+    
+    embed = EmbedBuilder().title(f"💤 {len(afk_users)} Mentioned Users Are AFK").color(discord.Color.yellow())
+    # Discord allows 25 fields per embed
+    shown = afk_users[:24] if len(afk_users) > 25 else afk_users
+    for user, entry in shown:
+        since = f"<t:{int(datetime.fromisoformat(entry['set_at']).timestamp())}:R>"
+        count = mention_counts.get(user.id, 1)
+        mentions = f" · mentioned {count} times" if count > 1 else ""
+        # Keep the reasons short so 25 fields stay under the 6000 character embed limit
+        embed.field(user.display_name[:32], f"{entry['reason'][:150]}\nSince {since}{mentions}", False)
+    if len(shown) < len(afk_users):
+        embed.field("More", f"...and {len(afk_users) - len(shown)} more", False)
+    
+    return embed.build()
+
 def report_embed(report_id: int, reported_user: discord.Member, reason: str) -> discord.Embed:
     """Create a report embed"""
     embed = EmbedBuilder().title("📋 Report Submitted").description(f"Report #{report_id} has been submitted").color(discord.Color.orange())
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+def unwrap(error: BaseException) -> BaseException:
+    """The exception a command wrapper (CommandInvokeError etc.) is carrying"""
+    while getattr(error, 'original', None) is not None:
+        error = error.original
+    return error
+
+def fingerprint(error: BaseException) -> str:
+    """Stable id of an error by exception type and normalized stack frames
+
+    Frames are reduced to file name and function, so line shifts, install
+    paths and the message (which often contains ids) do not split a bug
+    into several fingerprints.
+    """
+    error = unwrap(error)
+    error_type = type(error)
+    parts = [f"{error_type.__module__}.{error_type.__qualname__}"]
+    for frame in traceback.extract_tb(error.__traceback__):
+        parts.append(f"{os.path.basename(frame.filename)}:{frame.name}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+class ErrorGroup:
+    """Every occurrence of one fingerprint"""
+
+    __slots__ = ('fingerprint', 'type_name', 'message', 'location', 'command',
+                 'count', 'unreported', 'first_seen', 'last_seen')
+
+    def __init__(self, fingerprint: str, error: BaseException, command: Optional[str]):
+        self.fingerprint = fingerprint
+        self.type_name = type(error).__name__
+        self.message = str(error)[:200]
+        frames = traceback.extract_tb(error.__traceback__)
+        self.location = f"{os.path.basename(frames[-1].filename)}:{frames[-1].name}" if frames else None
+        self.command = command
+        self.count = 0
+        self.unreported = 0
+        self.first_seen = self.last_seen = datetime.utcnow()
+
+class ErrorTracker:
+    """Counts errors per fingerprint; only the first occurrence is reported in full
+
+    Repeats are counted and summarised by ``take_digest``. At most
+    ``maxsize`` fingerprints are kept, evicting the least recently seen.
+    """
+
+    def __init__(self, maxsize: int = 500):
+        self.maxsize = max(1, maxsize)
+        self.groups: "OrderedDict[str, ErrorGroup]" = OrderedDict()
+
+    def record(self, error: BaseException, command: Optional[str] = None) -> Tuple[ErrorGroup, bool]:
+        """Count an occurrence, returning its group and whether it is new"""
+        error = unwrap(error)
+        key = fingerprint(error)
+        group = self.groups.get(key)
+        is_new = group is None
+        if is_new:
+            group = self.groups[key] = ErrorGroup(key, error, command)
+            while len(self.groups) > self.maxsize:
+                self.groups.popitem(last=False)
+        else:
+            group.unreported += 1
+            group.last_seen = datetime.utcnow()
+            self.groups.move_to_end(key)
+        group.count += 1
+        return group, is_new
+
+    def take_digest(self) -> List[Tuple[ErrorGroup, int]]:
+        """Groups with repeats since the last digest and how many, resetting the counts"""
+        digest = []
+        for group in self.groups.values():
+            if group.unreported:
+                digest.append((group, group.unreported))
+                group.unreported = 0
+        return sorted(digest, key=lambda item: item[1], reverse=True)
+
+    def top(self, limit: int = 10) -> List[ErrorGroup]:
+        """Most frequent fingerprints"""
+        return sorted(self.groups.values(), key=lambda group: group.count, reverse=True)[:limit]
@@ -1,6 +1,8 @@
 import discord
+import os
 import re
 import asyncio
+from discord.ext import commands
 from datetime import datetime, timedelta
 from typing import Union, Optional, List
 
@@ -231,6 +233,12 @@ async def confirm_action(ctx, message: str, timeout: int = 30) -> bool:
         await ctx.send("❌ Confirmation timed out.", delete_after=5)
         return False
 
+def is_bot_owner():
+    """Command check allowing only the user set in OWNER_ID"""
+    async def predicate(ctx) -> bool:
+        return ctx.author.id == int(os.getenv('OWNER_ID', 0))
+    return commands.check(predicate)
+
 def create_progress_bar(current: int, total: int, length: int = 20) -> str:
     """Create a progress bar string"""
     if total == 0:
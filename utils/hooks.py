@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+import discord
+from typing import Callable, Awaitable, Optional, Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+# A prefilter is a cheap, synchronous test; the hook only runs when it returns True
+Prefilter = Callable[[discord.Message], bool]
+HookCallback = Callable[[discord.Message], Awaitable[None]]
+
+class MessageHook:
+    """A coroutine run for messages that pass its prefilter"""
+
+    __slots__ = ('name', 'callback', 'prefilter', 'calls', 'skipped', 'errors', 'total_time', 'max_time')
+
+    def __init__(self, name: str, callback: HookCallback, prefilter: Optional[Prefilter] = None):
+        self.name = name
+        self.callback = callback
+        self.prefilter = prefilter
+        self.calls = 0
+        self.skipped = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    async def run(self, message: discord.Message):
+        start = time.perf_counter()
+        try:
+            await self.callback(message)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error in message hook {self.name}: {e}")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.calls += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+class MessageHookRegistry:
+    """Message hooks that cogs subscribe to, dispatched from on_message
+
+    Prefilters are checked for every message; only hooks whose prefilter
+    passes are awaited, concurrently when more than one matches.
+    """
+
+    def __init__(self):
+        self._hooks: Dict[str, MessageHook] = {}
+
+    def register(self, name: str, callback: HookCallback, prefilter: Optional[Prefilter] = None) -> MessageHook:
+        """Subscribe a hook, replacing any hook with the same name"""
+        hook = MessageHook(name, callback, prefilter)
+        self._hooks[name] = hook
+        return hook
+
+    def unregister(self, name: str):
+        """Remove a hook if it is registered"""
+        self._hooks.pop(name, None)
+
+    async def dispatch(self, message: discord.Message):
+        """Run every hook whose prefilter accepts the message"""
+        matched = []
+        for hook in self._hooks.values():
+            try:
+                accepted = hook.prefilter is None or hook.prefilter(message)
+            except Exception as e:
+                hook.errors += 1
+                logger.error(f"Error in prefilter of message hook {hook.name}: {e}")
+                continue
+            if accepted:
+                matched.append(hook)
+            else:
+                hook.skipped += 1
+
+        if not matched:
+            return
+        if len(matched) == 1:
+            await matched[0].run(message)
+        else:
+            await asyncio.gather(*(hook.run(message) for hook in matched))
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Run counts and timings per hook"""
+        return {
+            name: {
+                'calls': hook.calls,
+                'skipped': hook.skipped,
+                'errors': hook.errors,
+                'avg_ms': round(hook.total_time / hook.calls * 1000, 3) if hook.calls else 0.0,
+                'max_ms': round(hook.max_time * 1000, 3)
+            }
+            for name, hook in self._hooks.items()
+        }
+
+# Prefilter building blocks
+
+def in_guild(message: discord.Message) -> bool:
+    """Message was sent in a server"""
+    return message.guild is not None
+
+def has_mentions(message: discord.Message) -> bool:
+    """Message mentions at least one user"""
+    return bool(message.mentions)
+
+def author_in(user_ids) -> Prefilter:
+    """Author's id is in a (live) collection of ids"""
+    return lambda message: message.author.id in user_ids
+
+def starts_with(prefixes: Iterable[str]) -> Prefilter:
+    """Message content starts with one of the given prefixes"""
+    prefixes = tuple(prefixes)
+    return lambda message: message.content.startswith(prefixes)
+
+def guild_enabled(is_enabled: Callable[[int], bool]) -> Prefilter:
+    """Message is in a server for which a feature is enabled"""
+    return lambda message: message.guild is not None and is_enabled(message.guild.id)
+
+def all_of(*prefilters: Prefilter) -> Prefilter:
+    return lambda message: all(prefilter(message) for prefilter in prefilters)
+
+def any_of(*prefilters: Prefilter) -> Prefilter:
+    return lambda message: any(prefilter(message) for prefilter in prefilters)
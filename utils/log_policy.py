@@ -0,0 +1,57 @@
+import random
+from typing import Dict, Iterable, Optional
+
+# Log levels, most to least verbose
+LEVELS = ('all', 'moderation', 'errors')
+
+# Command categories follow the cog a command belongs to
+CATEGORIES = ('utility', 'moderation', 'tickets', 'maintenance', 'help', 'logging')
+
+COG_CATEGORIES = {
+    'Utility': 'utility',
+    'Moderation': 'moderation',
+    'Tickets': 'tickets',
+    'Maintenance': 'maintenance',
+    'Help': 'help',
+    'LoggingSystem': 'logging'
+}
+
+class LogPolicy:
+    """What a guild wants logged: a level, disabled categories and per-command sampling
+
+    Errors and failed commands are always logged; levels, categories and
+    sampling only thin out successful events.
+    """
+
+    __slots__ = ('level', 'disabled', 'sampling')
+
+    def __init__(self, level: Optional[str] = None, disabled: Iterable[str] = (),
+                 sampling: Optional[Dict[str, float]] = None):
+        self.level = level or 'all'
+        self.disabled = frozenset(disabled)
+        self.sampling = dict(sampling or {})
+
+    @classmethod
+    def from_settings(cls, settings) -> 'LogPolicy':
+        return cls(settings.get('log_level'), settings.get('log_disabled_categories') or (),
+                   settings.get('log_sampling'))
+
+    @property
+    def is_default(self) -> bool:
+        return self.level == 'all' and not self.disabled and not self.sampling
+
+    def allows(self, kind: str, category: Optional[str], name: Optional[str], success: bool = True) -> bool:
+        """Whether an event should be logged"""
+        if kind == 'error' or not success:
+            return True
+        if self.level == 'errors':
+            return False
+        if self.level == 'moderation' and category != 'moderation':
+            return False
+        if category in self.disabled:
+            return False
+        rate = self.sampling.get(name)
+        return rate is None or random.random() < rate
+
+# Guilds without a policy log everything
+DEFAULT_POLICY = LogPolicy()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+
+class LogRecord:
+    """What happened, captured as plain values; rendered only when delivered"""
+
+    __slots__ = ('kind', 'success', 'guild_id', 'data', 'created_at')
+
+    def __init__(self, kind: str, data: Dict[str, Any], guild_id: Optional[int] = None, success: bool = True):
+        self.kind = kind
+        self.success = success
+        self.guild_id = guild_id
+        self.data = data
+        self.created_at = datetime.utcnow()
+
+class LogQueue:
+    """Bounded queue of log records delivered by one background worker
+
+    ``put`` never waits: when the queue is full the overflow policy drops
+    either the oldest queued record or the new one, and counts it.
+    """
+
+    def __init__(self, deliver: Callable[[LogRecord], Awaitable[None]], maxsize: int = 1000,
+                 overflow: str = 'drop_oldest'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.deliver = deliver
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self._records = deque()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = None
+        self.stats = {'enqueued': 0, 'delivered': 0, 'failed': 0, 'dropped': 0, 'high_water': 0}
+        self.delivery_time = 0.0
+
+    def __len__(self):
+        return len(self._records)
+
+    def start(self):
+        """Start the delivery worker"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def put(self, record: LogRecord) -> bool:
+        """Queue a record without waiting; False if it was dropped"""
+        if len(self._records) >= self.maxsize:
+            self.stats['dropped'] += 1
+            if self.overflow == 'drop_newest':
+                return False
+            self._records.popleft()
+
+        self._records.append(record)
+        self.stats['enqueued'] += 1
+        self.stats['high_water'] = max(self.stats['high_water'], len(self._records))
+        self._idle.clear()
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._records:
+                record = self._records.popleft()
+                start = time.perf_counter()
+                try:
+                    await self.deliver(record)
+                    self.stats['delivered'] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    print(f"Error delivering log record: {e}")
+                finally:
+                    self.delivery_time += time.perf_counter() - start
+            self._idle.set()
+
+    async def drain(self, timeout: float = 10.0) -> int:
+        """Wait for queued records to be delivered; returns how many were abandoned"""
+        if self._task is None or self._task.done():
+            abandoned = len(self._records)
+        else:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+                return 0
+            except asyncio.TimeoutError:
+                abandoned = len(self._records)
+
+        self.stats['dropped'] += abandoned
+        self._records.clear()
+        return abandoned
+
+    async def close(self, timeout: float = 10.0) -> int:
+        """Drain, then stop the worker"""
+        abandoned = await self.drain(timeout)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        return abandoned
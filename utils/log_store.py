@@ -0,0 +1,223 @@
+import json
+import mmap
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Every stored record has these keys in this order, so a field can be found
+# in the raw bytes (e.g. b'"u":123,') before any line is parsed
+FIELDS = ('t', 'k', 'ok', 'g', 'u', 'ch', 'c', 'a', 'e')
+
+INDEX_FILE = 'index.json'
+
+class Segment:
+    """One append-only segment file and its index entry"""
+
+    __slots__ = ('name', 'first', 'last', 'guilds', 'count')
+
+    def __init__(self, name: str, first: Optional[int] = None, last: Optional[int] = None,
+                 guilds=(), count: int = 0):
+        self.name = name
+        self.first = first
+        self.last = last
+        self.guilds = set(guilds)
+        self.count = count
+
+    def add(self, timestamp: int, guild_id: Optional[int]):
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        if guild_id is not None:
+            self.guilds.add(guild_id)
+        self.count += 1
+
+    def overlaps(self, since: Optional[int], until: Optional[int]) -> bool:
+        if self.first is None:
+            return False
+        return (since is None or self.last >= since) and (until is None or self.first <= until)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'first': self.first, 'last': self.last, 'guilds': sorted(self.guilds), 'count': self.count}
+
+class LogStore:
+    """Rotating append-only store of structured log records (JSON lines)
+
+    Records go to the newest segment until it reaches ``segment_bytes``;
+    then a new segment is started and the oldest beyond ``max_segments``
+    are deleted. ``index.json`` keeps each segment's time range and guild
+    ids so searches only open segments that can match, and those are
+    scanned through mmap without being read into memory.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, max_segments: int = 256):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        self.segments: List[Segment] = []
+        self._file = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, segment: Segment) -> str:
+        return os.path.join(self.directory, segment.name)
+
+    def _load_index(self):
+        """Read index.json, re-indexing segments it does not cover (e.g. after a crash)"""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith('segment-') and name.endswith('.jsonl'))
+        for name in names:
+            entry = index.get(name)
+            # The active segment is never complete in the index
+            if entry is None or name == names[-1]:
+                segment = Segment(name)
+                for record in self._scan(segment):
+                    segment.add(record['t'], record['g'])
+            else:
+                segment = Segment(name, entry['first'], entry['last'], entry['guilds'], entry['count'])
+            self.segments.append(segment)
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({segment.name: segment.to_dict() for segment in self.segments}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _rotate(self):
+        """Start a new segment and drop the oldest beyond max_segments"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        number = int(self.segments[-1].name[8:16]) + 1 if self.segments else 1
+        self.segments.append(Segment(f"segment-{number:08d}.jsonl"))
+        while len(self.segments) > self.max_segments:
+            oldest = self.segments.pop(0)
+            try:
+                os.remove(self._path(oldest))
+            except OSError:
+                pass
+        self._save_index()
+
+    def append(self, kind: str, success: bool, guild_id: Optional[int], user_id: Optional[int],
+               channel_id: Optional[int], name: Optional[str], detail: str = "", error: str = "",
+               timestamp: Optional[float] = None):
+        """Write one record"""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        line = json.dumps(
+            dict(zip(FIELDS, (timestamp, kind, success, guild_id, user_id, channel_id, name,
+                              detail[:1000], error[:2000]))),
+            separators=(',', ':')
+        ).encode() + b'\n'
+
+        with self._lock:
+            if not self.segments or (self._file is not None and self._file.tell() >= self.segment_bytes):
+                self._rotate()
+            if self._file is None:
+                # Unbuffered: each record is one write, visible to searches at once
+                self._file = open(self._path(self.segments[-1]), 'ab', buffering=0)
+            self._file.write(line)
+            self.segments[-1].add(timestamp, guild_id)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.segments:
+                self._save_index()
+
+    def _scan(self, segment: Segment, needle: Optional[bytes] = None,
+              match: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Iterator[Dict[str, Any]]:
+        """Records of a segment in write order, jumping between occurrences of ``needle``"""
+        path = self._path(segment)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if needle is None:
+                    lines = iter(mm.readline, b'')
+                else:
+                    lines = self._lines_containing(mm, needle)
+                for line in lines:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    if match is None or match(record):
+                        yield record
+
+    @staticmethod
+    def _lines_containing(mm: mmap.mmap, needle: bytes) -> Iterator[bytes]:
+        position = mm.find(needle)
+        while position != -1:
+            start = mm.rfind(b'\n', 0, position) + 1
+            end = mm.find(b'\n', position)
+            if end == -1:
+                end = len(mm)
+            yield mm[start:end]
+            position = mm.find(needle, end)
+
+    def search(self, guild_id: Optional[int] = None, user_id: Optional[int] = None,
+               name: Optional[str] = None, since: Optional[int] = None, until: Optional[int] = None,
+               kind: Optional[str] = None, limit: int = 25) -> List[Dict[str, Any]]:
+        """Newest records matching every given filter (times are unix seconds)"""
+        # The rarest field makes the best needle
+        if user_id is not None:
+            needle = f'"u":{user_id},'.encode()
+        elif name is not None:
+            needle = f'"c":{json.dumps(name)},'.encode()
+        elif guild_id is not None:
+            needle = f'"g":{guild_id},'.encode()
+        else:
+            needle = None
+
+        def match(record):
+            return ((guild_id is None or record['g'] == guild_id)
+                    and (user_id is None or record['u'] == user_id)
+                    and (name is None or record['c'] == name)
+                    and (kind is None or record['k'] == kind)
+                    and (since is None or record['t'] >= since)
+                    and (until is None or record['t'] <= until))
+
+        with self._lock:
+            segments = list(self.segments)
+
+        results = []
+        for segment in reversed(segments):
+            if not segment.overlaps(since, until):
+                continue
+            if guild_id is not None and guild_id not in segment.guilds:
+                continue
+            found = list(self._scan(segment, needle, match))
+            results.extend(reversed(found))
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = list(self.segments)
+        total = 0
+        for segment in segments:
+            try:
+                total += os.path.getsize(self._path(segment))
+            except OSError:
+                pass
+        return {
+            'segments': len(segments),
+            'records': sum(segment.count for segment in segments),
+            'bytes': total,
+            'oldest': segments[0].first if segments else None
+        }
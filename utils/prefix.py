@@ -0,0 +1,73 @@
+import discord
+from typing import Dict, Iterable, Optional, Tuple
+
+class PrefixMatcher:
+    """Precompiled command prefixes for the global prefix, mentions and per-guild prefixes
+
+    ``could_be_command`` is a single ``str.startswith`` against a prebuilt
+    tuple, cheap enough to run on every message so that messages which
+    cannot be commands never reach ``process_commands`` (and never get a
+    Context built for them). The bot's ``command_prefix`` resolves through
+    ``prefixes_for`` so the two can never disagree.
+    """
+
+    def __init__(self, default_prefixes: Iterable[str]):
+        self.default_prefixes = tuple(default_prefixes)
+        self.guild_prefixes: Dict[int, str] = {}
+        self._mentions: Tuple[str, ...] = ()
+        self._default: Tuple[str, ...] = self.default_prefixes
+        self._per_guild: Dict[int, Tuple[str, ...]] = {}
+        self.stats = {'accepted': 0, 'rejected': 0}
+
+    def set_user_id(self, user_id: int):
+        """Accept mentions of the bot as a prefix once its user id is known"""
+        self._mentions = (f'<@{user_id}> ', f'<@!{user_id}> ')
+        self._rebuild()
+
+    def set_guild_prefix(self, guild_id: int, prefix: Optional[str]):
+        """Use a custom prefix in a guild instead of the default (None restores the default)"""
+        if prefix is None:
+            self.guild_prefixes.pop(guild_id, None)
+            self._per_guild.pop(guild_id, None)
+        else:
+            self.guild_prefixes[guild_id] = prefix
+            self._per_guild[guild_id] = (prefix,) + self._mentions
+
+    def load_guild_prefixes(self, prefixes: Dict[int, str]):
+        """Replace every per-guild prefix at once"""
+        self.guild_prefixes = dict(prefixes)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._default = self.default_prefixes + self._mentions
+        self._per_guild = {
+            guild_id: (prefix,) + self._mentions
+            for guild_id, prefix in self.guild_prefixes.items()
+        }
+
+    def prefixes_for(self, guild_id: Optional[int]) -> Tuple[str, ...]:
+        """Every prefix that starts a command in a guild (or in DMs for None)"""
+        if guild_id is None:
+            return self._default
+        return self._per_guild.get(guild_id, self._default)
+
+    def display_prefix(self, guild_id: Optional[int]) -> str:
+        """The prefix to show users in a guild"""
+        if guild_id is not None and guild_id in self.guild_prefixes:
+            return self.guild_prefixes[guild_id]
+        return self.default_prefixes[0]
+
+    def could_be_command(self, message: discord.Message) -> bool:
+        """False when the message certainly does not invoke a command"""
+        guild = message.guild
+        prefixes = self._default if guild is None else self._per_guild.get(guild.id, self._default)
+        if message.content.startswith(prefixes):
+            self.stats['accepted'] += 1
+            return True
+        self.stats['rejected'] += 1
+        return False
+
+    def command_prefix(self, bot, message: discord.Message) -> Tuple[str, ...]:
+        """``command_prefix`` callable for commands.Bot"""
+        guild = message.guild
+        return self.prefixes_for(guild.id if guild is not None else None)
@@ -0,0 +1,95 @@
+import asyncio
+import discord
+from typing import Awaitable, Callable, Dict, Hashable
+from utils.cache import TTLCache
+
+class UserResolver:
+    """Shared user and DM-channel lookups that avoid repeat REST calls
+
+    Users come from the gateway cache first, then from a bounded TTL cache
+    of users fetched earlier, and only then from ``fetch_user``. DM channels
+    are cached the same way. Concurrent lookups of the same id share one
+    request.
+    """
+
+    def __init__(self, bot, maxsize: int = 1000, ttl: float = 3600.0):
+        self.bot = bot
+        self.users = TTLCache(maxsize, ttl)
+        self.dm_channels = TTLCache(maxsize, ttl)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {'gateway_hits': 0, 'cache_hits': 0, 'coalesced': 0, 'fetches': 0, 'dm_opens': 0}
+
+    async def _coalesced(self, key: Hashable, request: Callable[[], Awaitable]):
+        """Run a request, or join the identical one already in flight"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            task = asyncio.ensure_future(request())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller being cancelled does not cancel the others
+        return await asyncio.shield(task)
+
+    async def get_user(self, user_id: int) -> discord.User:
+        """Resolve a user, raising discord.NotFound for unknown ids"""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.stats['gateway_hits'] += 1
+            return user
+
+        found, user = self.users.lookup(user_id)
+        if found:
+            self.stats['cache_hits'] += 1
+            return user
+
+        async def fetch():
+            self.stats['fetches'] += 1
+            fetched = await self.bot.fetch_user(user_id)
+            self.users.set(user_id, fetched)
+            return fetched
+
+        return await self._coalesced(('user', user_id), fetch)
+
+    async def get_dm_channel(self, user_id: int) -> discord.DMChannel:
+        """Resolve a user's DM channel, opening it only once"""
+        user = await self.get_user(user_id)
+        if user.dm_channel is not None:
+            self.stats['cache_hits'] += 1
+            return user.dm_channel
+
+        found, channel = self.dm_channels.lookup(user_id)
+        if found:
+            self.stats['cache_hits'] += 1
+            return channel
+
+        async def open_dm():
+            self.stats['dm_opens'] += 1
+            opened = await user.create_dm()
+            self.dm_channels.set(user_id, opened)
+            return opened
+
+        return await self._coalesced(('dm', user_id), open_dm)
+
+    async def send_dm(self, user_id: int, *args, **kwargs) -> discord.Message:
+        """Send a direct message to a user by id"""
+        channel = await self.get_dm_channel(user_id)
+        return await channel.send(*args, **kwargs)
+
+    def forget(self, user_id: int):
+        """Drop cached entries for a user (e.g. after a failed DM)"""
+        self.users.invalidate(user_id)
+        self.dm_channels.invalidate(user_id)
+
+    @property
+    def calls_saved(self) -> int:
+        """REST requests avoided by the gateway cache, the TTL caches and coalescing"""
+        return self.stats['gateway_hits'] + self.stats['cache_hits'] + self.stats['coalesced']
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'calls_saved': self.calls_saved,
+            'users': self.users.get_stats(),
+            'dm_channels': self.dm_channels.get_stats()
+        }